@@ -1,110 +1,177 @@
 import numpy as np
-from flask import Flask, render_template, jsonify, request, redirect
+from flask import Flask, render_template, jsonify, request, redirect, Response, g
 import pandas as pd
-from data_processing import process_bea_data, process_bitcoin_data, process_fred_data, remove_fully_nan_rows, get_today, preprocess_for_tft
-from predict import load_model, run_tft_prediction
+from data_processing import process_bea_data, process_bitcoin_data, process_fred_data, remove_fully_nan_rows, get_today, get_tft_preprocessor
+from predict import load_model, run_tft_prediction, prepare_prediction_window, prediction_window_bounds, model_registry, \
+    ForecastCache, check_window_lengths, inference_datasets, model_digest, preload_model, run_tft_batch_prediction
 from data_util import HolidayUtil, BTC, BEA, FRED
+from data_util.cache_util import FileFingerprint, RefreshCache
+from data_util.subset_util import SubsetStore
+from data_util.storage_util import get_storage
+from data_util.http_util import transport
+from data_util.pipeline_util import Pipeline
+from data_util.frame_util import assemble_daily
+from data_util.metrics_util import REFRESH_SECONDS, REGISTRY, REQUEST_SECONDS
+from data_util.json_util import ResponseEncoder, columnar, content_etag, dumps, epoch_days, etag_matches, lttb
 from datetime import datetime, timedelta
 import os
 import threading
-from apscheduler.schedulers.background import BackgroundScheduler
+import time
+from data_util.config import Config
+from scheduler import RefreshScheduler, refresh_lock
+from inference_queue import InferenceQueue, QueueFull
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
-FILE_PATH = "Data/daily_data.csv"
+DATA_PATH = "Data"
+DAILY_DATA = "daily_data"
+SUBSET_DIR = "Subsets"
 FILE_PATH_log = "Data/data_fetching_log.csv"
-SUBSET_PATH = "Data/Subsets/"
-data_loading = False
-data_lock = threading.Lock()
-
-def get_data():
-    global data_loading
-    with data_lock:
-        if data_loading:
-            return
-        data_loading = True
-
-    try:
-        if os.path.exists(FILE_PATH):
-            file_date = datetime.fromtimestamp(os.path.getmtime(FILE_PATH)).date()
-            if file_date == datetime.today().date():
-                print("Podatki so že posodobljeni danes.")
-                return None
-
-        os.makedirs(SUBSET_PATH, exist_ok=True)
-        main_df = pd.DataFrame(index=pd.date_range(start="2000-01-01", end="2030-12-31", freq="D"))
-        main_df.index.name = "Date"
-
+storage = get_storage(DATA_PATH)
+# Resolved on every check: with the CSV fallback the file moves to the backend on the first refresh
+data_fingerprint = FileFingerprint(lambda: storage.path(DAILY_DATA))
+forecast_cache = ForecastCache(max_entries=64)
+forecast_jobs = InferenceQueue()
+response_encoder = ResponseEncoder()
+REGISTRY.register_stats("btcpred_model_registry", model_registry.stats)
+REGISTRY.register_stats("btcpred_forecast_cache", forecast_cache.stats)
+REGISTRY.register_stats("btcpred_inference_datasets", inference_datasets.stats)
+REGISTRY.register_stats("btcpred_forecast_jobs", forecast_jobs.stats)
+REGISTRY.register_stats("btcpred_responses", response_encoder.stats)
+subset_store = SubsetStore(storage, SUBSET_DIR)
+
+def build_refresh_pipeline():
+    """
+    Osvežitev kot graf stopenj: neodvisni viri (BTC indeksi, ETF, BEA, FRED) tečejo vzporedno,
+    končni izhodi stopenj se shranijo, da neuspeh ene ne zahteva ponovnega prenosa ostalih.
+    """
+    pipeline = Pipeline(max_workers=4)
+
+    @pipeline.stage("btc", outputs=["df_btc"])
+    def fetch_btc():
         print("Pridobivanje BTC podatkov...")
         df_btc = BTC.get_crypto_data("BTC-USD")
         if df_btc is None or df_btc.empty:
-            print("Napaka pri pridobivanju BTC podatkov.")
-            return None
+            raise ValueError("Napaka pri pridobivanju BTC podatkov.")
+        return df_btc
 
-        main_df = main_df.merge(df_btc, on="Date", how="left")
-        bitcoin_df_indices = process_bitcoin_data(df_btc, explained_var=0.8)
-        bitcoin_df = BTC.get_bitcoin_indices()
-        main_df = main_df.merge(bitcoin_df_indices, on="Date", how="left")
-        main_df = main_df.merge(bitcoin_df, on="Date", how="left")
+    @pipeline.stage("btc_indicators", inputs=["df_btc"], outputs=["bitcoin_df_indices"])
+    def btc_indicators(df_btc):
+        return process_bitcoin_data(df_btc, explained_var=0.8)
 
-        remove_fully_nan_rows(df_btc.merge(bitcoin_df, on="Date", how="left")).to_csv(f"{SUBSET_PATH}btc.csv", index=True)
+    @pipeline.stage("btc_indices", outputs=["bitcoin_df"])
+    def btc_indices():
+        return BTC.get_bitcoin_indices()
 
-        bitcoin_etf_df = BTC.get_etf_flows()
-        main_df = main_df.merge(bitcoin_etf_df, on="Date", how="left")
-        remove_fully_nan_rows(bitcoin_etf_df).to_csv(f"{SUBSET_PATH}btc-etf.csv", index=True)
+    @pipeline.stage("etf", outputs=["bitcoin_etf_df"])
+    def etf():
+        return BTC.get_etf_flows()
 
+    @pipeline.stage("bea", inputs=["df_btc", "bitcoin_df"], outputs=["bea_indices_df", "orig_bea_df"])
+    def bea(df_btc, bitcoin_df):
         print("Obdelava BEA podatkov...")
-        bea_indices_df, orig_bea_df = process_bea_data(bea=BEA(), df_btc=df_btc, explained_var=0.8, nan_threshold=0.7, min_date=bitcoin_df.index.min())
-        main_df = main_df.merge(bea_indices_df, on="Date", how="left")
-        remove_fully_nan_rows(orig_bea_df).to_csv(f"{SUBSET_PATH}bea.csv", index=True)
-
-        df_indices = bitcoin_df_indices.merge(bea_indices_df, on="Date", how="left")
-        remove_fully_nan_rows(df_indices).to_csv(f"{SUBSET_PATH}indicators.csv", index=True)
+        return process_bea_data(bea=BEA(), df_btc=df_btc, explained_var=0.8, nan_threshold=0.7, min_date=bitcoin_df.index.min())
 
+    @pipeline.stage("fred", inputs=["df_btc"], outputs=["fred_df", "orig_fred"])
+    def fred(df_btc):
         print("Obdelava FRED podatkov...")
-        fred_df, orig_fred = process_fred_data(FRED(), df_btc)
-        main_df = main_df.merge(fred_df, on="Date", how="left")
-        remove_fully_nan_rows(orig_fred).to_csv(f"{SUBSET_PATH}fred.csv", index=True)
+        return process_fred_data(FRED(), df_btc)
+
+    @pipeline.stage("assemble", inputs=["df_btc", "bitcoin_df_indices", "bitcoin_df", "bitcoin_etf_df",
+                                         "bea_indices_df", "orig_bea_df", "fred_df", "orig_fred"],
+                    outputs=["main_df"], checkpoint=False)
+    def assemble(df_btc, bitcoin_df_indices, bitcoin_df, bitcoin_etf_df, bea_indices_df, orig_bea_df, fred_df,
+                 orig_fred):
+        storage.write(f"{SUBSET_DIR}/btc", remove_fully_nan_rows(df_btc.merge(bitcoin_df, on="Date", how="left")))
+        storage.write(f"{SUBSET_DIR}/btc-etf", remove_fully_nan_rows(bitcoin_etf_df))
+        storage.write(f"{SUBSET_DIR}/bea", remove_fully_nan_rows(orig_bea_df))
+        df_indices = bitcoin_df_indices.merge(bea_indices_df, on="Date", how="left")
+        storage.write(f"{SUBSET_DIR}/indicators", remove_fully_nan_rows(df_indices))
+        storage.write(f"{SUBSET_DIR}/fred", remove_fully_nan_rows(orig_fred))
+        subset_store.publish()
 
-        main_df = remove_fully_nan_rows(main_df)
+        # Vse izhode poravnamo na končni dnevni indeks (od prve vrednosti Close) v enem koraku
+        main_df = assemble_daily([df_btc, bitcoin_df_indices, bitcoin_df, bitcoin_etf_df, bea_indices_df, fred_df],
+                                 trim_column="Close", float32=Config.FLOAT32_FRAMES)
 
         print("Dodajanje praznikov...")
         holiday_df = HolidayUtil.generate_holiday_dataframe(df_btc.index.min(), main_df.index.max())
-        main_df = main_df[main_df.index >= main_df['Close'].first_valid_index()]
         main_df = main_df.merge(holiday_df, on="Date", how="left")
 
-        main_df.to_csv(FILE_PATH, index=True)
-        log_entry = pd.DataFrame([[get_today(), "OK"]], columns=["Date", "Status"])
-        log_entry.to_csv(FILE_PATH_log, mode='a', header=not os.path.exists(FILE_PATH_log), index=False)
+        storage.write(DAILY_DATA, main_df)
+        return main_df
+
+    return pipeline
+
+def get_data(force=False):
+    """Full data refresh. Without force it is skipped if daily_data is already from today."""
+    # Medprocesni zaklep: hkrati teče največ ena osvežitev
+    if not refresh_lock.acquire(blocking=False):
+        print("Osvežitev podatkov že teče.")
+        return
+
+    source_cache = RefreshCache.begin()
+    transport.reset_stats()
+    pipeline = build_refresh_pipeline()
+    start, status = time.perf_counter(), "error"
+    try:
+        if not force and storage.exists(DAILY_DATA):
+            file_date = datetime.fromtimestamp(storage.mtime(DAILY_DATA)).date()
+            if file_date == datetime.today().date():
+                print("Podatki so že posodobljeni danes.")
+                status = "skipped"
+                return None
+
+        main_df = pipeline.run()["main_df"]
+
+        # Parametri predprocesiranja (clip, scaler) se izračunajo enkrat na novo verzijo podatkov
+        get_tft_preprocessor(main_df.sort_index(), data_fingerprint.digest())
+        status = "ok"
+        append_log("OK", f"{source_cache.summary()} | {transport.summary()}", pipeline.timings_summary())
         print("Podatki uspešno shranjeni.")
+        print(source_cache.summary())
+        print(transport.summary())
 
     except Exception as e:
         print(f"Napaka pri nalaganju podatkov: {e}")
         error_message = str(e)  # Pretvori Exception v string
-        log_entry = pd.DataFrame([[get_today(), error_message]], columns=["Date", "Status"])
-        log_entry.to_csv(FILE_PATH_log, mode='a', header=not os.path.exists(FILE_PATH_log), index=False)
+        append_log(error_message, f"{source_cache.summary()} | {transport.summary()}", pipeline.timings_summary())
         print(f"Napaka pri nalaganju podatkov: {error_message}")
 
     finally:
-        with data_lock:
-            data_loading = False
+        if status != "skipped":
+            REFRESH_SECONDS.observe(time.perf_counter() - start, status=status)
+        RefreshCache.end()
+        refresh_lock.release()
 
-def schedule_data_check():
-    """Preveri in osveži podatke vsakih 10 minut."""
-    global data_loading
+LOG_COLUMNS = ["Date", "Status", "Details", "Timings"]
 
-    file_exists = os.path.exists(FILE_PATH)
-    file_updated_today = file_exists and datetime.fromtimestamp(os.path.getmtime(FILE_PATH)).date() == datetime.today().date()
-    print("checking data")
-    if not file_updated_today:
-        if not data_loading:  # Preveri brez zaklepa
-            print("Samodejna posodobitev podatkov...")
-            threading.Thread(target=get_data, daemon=True).start()
+def append_log(status, details="", timings=""):
+    """
+    Appends a row to the data fetching log (timings = per-stage durations of the refresh), upgrading logs
+    written before the Details/Timings columns existed.
+    """
+    if os.path.exists(FILE_PATH_log):
+        with open(FILE_PATH_log) as f:
+            header = f.readline().strip()
+        if header != ",".join(LOG_COLUMNS):
+            pd.read_csv(FILE_PATH_log).reindex(columns=LOG_COLUMNS, fill_value="").to_csv(FILE_PATH_log, index=False)
 
+    log_entry = pd.DataFrame([[get_today(), status, details, timings]], columns=LOG_COLUMNS)
+    log_entry.to_csv(FILE_PATH_log, mode='a', header=not os.path.exists(FILE_PATH_log), index=False)
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(schedule_data_check, "interval", minutes=0.1)
-scheduler.start()
+def warm_up_model(model):
+    """Runs one forward pass on the latest data so the first real request doesn't pay for lazy init."""
+    if not storage.exists(DAILY_DATA):
+        return
+    compute_forecast_payload(model, 31, 31, pd.Timestamp(datetime.today().date()))
+
+
+model_registry.add_warmup(warm_up_model)
+
+# Osvežitve ob objavah virov; razporejevalnik teče v enem procesu na namestitev
+refresh_scheduler = RefreshScheduler(get_data)
+refresh_scheduler.start()
 
 @app.route("/")
 def redirect_home():
@@ -128,33 +195,56 @@ def data_page():
 
 @app.route("/get_metrics/<category>")
 def get_metrics(category):
-    file_path = f"{SUBSET_PATH}{category}.csv"
-    if not os.path.exists(file_path):
+    metrics = subset_store.metrics(category)
+    if metrics is None:
         return jsonify({"error": "File not found"}), 404
 
-    df = pd.read_csv(file_path, index_col="Date", parse_dates=True)
-    metrics = list(df.columns)
     return jsonify({"metrics": metrics})
 
 @app.route("/get_chart_data")
 def get_chart_data():
+    """
+    Observations of a metric, optionally limited to start..end (YYYY-MM-DD) and to max_points points. Zoomed-out
+    requests are answered from the weekly/monthly min/max/mean aggregates ("resolution" in the response).
+    """
     category = request.args.get("category")
     metric = request.args.get("metric")
-    file_path = f"{SUBSET_PATH}{category}.csv"
 
-    if not os.path.exists(file_path):
+    max_points = request.args.get("max_points", type=int)
+    try:
+        start, end = (int(epoch_days([request.args[name]])[0]) if request.args.get(name) else None
+                      for name in ("start", "end"))
+    except ValueError:
+        return jsonify({"error": "start and end must be dates (YYYY-MM-DD)"}), 400
+    if max_points is not None and max_points < 2:
+        return jsonify({"error": "max_points must be at least 2"}), 400
+
+    metrics = subset_store.metrics(category)
+    if metrics is None:
         return jsonify({"error": "File not found"}), 404
-
-    df = pd.read_csv(file_path, index_col="Date", parse_dates=True)
-    if metric not in df.columns:
+    if metric not in metrics:
         return jsonify({"error": "Metric not found"}), 404
 
-    df = df.dropna(subset=[metric])
-
-    return jsonify({
-        "dates": df.index.strftime("%Y-%m-%d").tolist(),
-        "values": df[metric].tolist()
-    })
+    def build():
+        level, days, values, lows, highs = subset_store.window(category, metric, start, end, max_points)
+        # Tudi mesečni nivo je pregost: izbor točk z LTTB
+        if max_points and len(days) > max_points:
+            keep = lttb(days, values, max_points)
+            days, values, lows, highs = days[keep], values[keep], lows[keep], highs[keep]
+        # Stolpčni zapis: datumi kot zamik v dnevih od začetnega datuma
+        payload = {
+            "start": str(np.datetime64(int(days[0]), "D")) if len(days) else None,
+            "days": days - days[0] if len(days) else days,
+            "values": values,
+            "resolution": level,
+        }
+        if level != "day":
+            payload.update({"min": lows, "max": highs})
+        return dumps(payload)
+
+    # ETag je znan že pred serializacijo: nespremenjeni podatki se ne serializirajo znova (304)
+    return json_response(build, etag=content_etag("chart", subset_store.version(), category, metric, start, end,
+                                                  max_points))
 
 @app.route("/predict_and_plot", methods=["GET"])
 def predict_and_plot():
@@ -163,49 +253,218 @@ def predict_and_plot():
     max_encoder_length = int(request.args.get("max_encoder_length", 31))
     max_prediction_length = int(request.args.get("max_prediction_length", 31))
 
-    if not os.path.exists(FILE_PATH):
+    if not storage.exists(DAILY_DATA):
         return jsonify({"error": "Daily data file not found"}), 404
 
-    df_final = pd.read_csv(FILE_PATH, index_col="Date", parse_dates=True)
-    df_final = df_final.sort_index()
-
-    # Preprocess for TFT
-    df_final = preprocess_for_tft(df_final)
-    shift = 0
-    # Define cutoff points
-    today = pd.Timestamp(datetime.today().date())  # Convert to Timestamp
-    prediction_start = today - pd.Timedelta(days=shift)
-    training_cutoff = prediction_start - pd.Timedelta(days=1)  # Ensure it's in the right format
-
-    # Filter only the necessary data for TFT
-    filtered_data = df_final[
-        (df_final.index >= training_cutoff - timedelta(days=max_encoder_length)) &
-        (df_final.index <= prediction_start + timedelta(days=max_prediction_length))
-        ].copy()
-    filtered_data["time_idx"] = filtered_data["time_idx"].astype(int)
-    # Load model
-    best_tft = load_model()
-
-    # Run prediction
-    predictions_df = run_tft_prediction(best_tft, filtered_data, max_prediction_length)
+    # Napoved teče v skupni vrsti (združevanje enakih zahtev, omejena dolžina), zahteva le počaka nanjo
+    try:
+        payload = forecast_jobs.run(*forecast_job(max_encoder_length, max_prediction_length),
+                                    timeout=FORECAST_TIMEOUT)
+    except QueueFull as e:
+        return jsonify({"error": f"Server is busy: {e}"}), 503, {"Retry-After": "5"}
+    except TimeoutError as e:
+        return jsonify({"error": str(e)}), 504
+    return json_response(payload)
+
+FORECAST_TIMEOUT = 300
+
+def forecast_job(max_encoder_length, max_prediction_length):
+    """(key, fn(report)) of a forecast job; equal keys (same data, model and parameters) are coalesced."""
+    prediction_start = pd.Timestamp(datetime.today().date())
+    key = (data_fingerprint.digest(), model_digest(), max_encoder_length,
+           max_prediction_length, str(prediction_start))
+
+    def run(report):
+        report("loading model", 0.05)
+        # Cached model (loaded once per process)
+        best_tft = load_model()
+        return forecast_cache.get_or_compute(
+            data_fingerprint.digest(), best_tft.checkpoint_digest, max_encoder_length, max_prediction_length,
+            prediction_start,
+            lambda: compute_forecast_payload(best_tft, max_encoder_length, max_prediction_length, prediction_start,
+                                             report)
+        )
+    return key, run
+
+@app.route("/forecast_jobs", methods=["POST"])
+def submit_forecast_job():
+    """Queues a forecast and returns its job id right away (202); poll the status, then fetch the result."""
+    params = {**request.args, **(request.get_json(silent=True) or {})}
+    max_encoder_length = int(params.get("max_encoder_length", 31))
+    max_prediction_length = int(params.get("max_prediction_length", 31))
+
+    if not storage.exists(DAILY_DATA):
+        return jsonify({"error": "Daily data file not found"}), 404
+    try:
+        job, created = forecast_jobs.submit(*forecast_job(max_encoder_length, max_prediction_length))
+    except QueueFull as e:
+        return jsonify({"error": f"Server is busy: {e}"}), 503, {"Retry-After": "5"}
+    return jsonify({**job.to_dict(), "coalesced": not created,
+                    "status_url": f"/forecast_jobs/{job.id}", "result_url": f"/forecast_jobs/{job.id}/result"}), 202
+
+@app.route("/forecast_jobs/<job_id>")
+def forecast_job_status(job_id):
+    job = forecast_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/forecast_jobs/<job_id>/result")
+def forecast_job_result(job_id):
+    job = forecast_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.status == "failed":
+        return jsonify({"error": job.error}), 500
+    if job.status != "done":
+        return jsonify(job.to_dict()), 202
+    return json_response(job.result)
+
+def json_response(body, etag=None):
+    """
+    Serialized JSON (bytes, or a callable building them) with an ETag, 304 for a matching If-None-Match and
+    gzip/brotli negotiation. With the etag known up front, a callable body is not built for a 304.
+    """
+    if etag is not None and etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    if callable(body):
+        body = body()
+    if isinstance(body, str):
+        body = body.encode()
+    etag = etag or content_etag(body)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    body, encoding = response_encoder.encode(body, etag, request.headers.get("Accept-Encoding"))
+    response = Response(body, mimetype="application/json")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+def compute_forecast_payload(model, max_encoder_length, max_prediction_length, prediction_start, report=None):
+    """Preprocesses only the prediction window, runs the model and returns the serialized JSON payload."""
+    report = report or (lambda stage, progress: None)
+
+    def build_window():
+        report("loading data", 0.15)
+        df_final = storage.read(DAILY_DATA, mmap=True)
+        df_final = df_final.sort_index()
+
+        # Preprocess for TFT (parameters fitted once per data version, features only for the window)
+        report("preprocessing", 0.35)
+        preprocessor = get_tft_preprocessor(df_final, data_fingerprint.digest())
+        df_final = preprocessor.transform(
+            df_final, *prediction_window_bounds(max_encoder_length, max_prediction_length, prediction_start))
+
+        # Filter only the necessary data for TFT
+        return prepare_prediction_window(df_final, max_encoder_length, max_prediction_length, prediction_start)
+
+    # Run prediction (the window is reused while the data is unchanged, also across model swaps)
+    dataset_key = (data_fingerprint.digest(), max_encoder_length, max_prediction_length, str(prediction_start))
+    predictions_df = run_tft_prediction(model, build_window, max_prediction_length, dataset_key, report)
+
+    report("serializing", 0.95)
+    historical = predictions_df["Close"].notna().to_numpy()
+
+    # Stolpčni zapis (polje na stolpec, NaN -> null v kodirniku), brez seznamov slovarjev po vrsticah
+    return dumps({
+        "historical": columnar(predictions_df[historical], FORECAST_COLUMNS, dates="Date"),
+        "predicted": columnar(predictions_df[~historical], FORECAST_COLUMNS, dates="Date"),
+    })
 
-    historical_data = predictions_df[predictions_df["Close"].notna()]
-    predicted_data = predictions_df[predictions_df["Close"].isna()]
+FORECAST_COLUMNS = ["Close", "Predicted_Median", "Lower_Bound", "Upper_Bound"]
+
+MAX_BATCH_WINDOWS = 512
+
+def positive_lengths(values, name, allow_scalar=True):
+    """List of positive integer lengths of a batch request (a single integer too with allow_scalar)."""
+    if allow_scalar and not isinstance(values, list):
+        values = [values]
+    if not isinstance(values, list):
+        raise ValueError(f"{name} must be a list of positive integers")
+    # bool is an int subclass and 7.5 would be truncated by int(); neither is a valid length
+    if not all(isinstance(value, int) and not isinstance(value, bool) and value > 0 for value in values):
+        raise ValueError(f"{name} must be positive integers, got {values}")
+    return values
+
+@app.route("/predict_batch", methods=["POST"])
+def predict_batch():
+    """
+    Forecasts every combination of cutoffs (prediction starts) x horizons x encoder lengths in one go:
+    {"cutoffs": ["2025-01-01", ...], "horizons": [7, 31], "max_encoder_length": 31 | [31, 62]}.
+    Missing cutoffs/horizons default to today / 31 days. Horizons longer than the model's and encoder
+    lengths outside its range are rejected with 400.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        body = {}
+    try:
+        cutoffs = body.get("cutoffs", [str(datetime.today().date())])
+        if not isinstance(cutoffs, list):
+            raise ValueError("cutoffs must be a list of dates")
+        cutoffs = [pd.Timestamp(cutoff).normalize() for cutoff in cutoffs]
+        horizons = positive_lengths(body.get("horizons", [31]), "horizons", allow_scalar=False)
+        encoder_lengths = positive_lengths(body.get("max_encoder_length", 31), "max_encoder_length")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid batch request: {e}"}), 400
+
+    windows = [(cutoff, encoder_length, horizon)
+               for cutoff in cutoffs for encoder_length in encoder_lengths for horizon in horizons]
+    if not windows or len(windows) > MAX_BATCH_WINDOWS:
+        return jsonify({"error": f"A batch needs between 1 and {MAX_BATCH_WINDOWS} windows, got {len(windows)}"}), 400
+    if not storage.exists(DAILY_DATA):
+        return jsonify({"error": "Daily data file not found"}), 404
 
-    historical_data = historical_data.where(pd.notna(historical_data), None)
-    predicted_data = predicted_data.where(pd.notna(predicted_data), None)
+    best_tft = load_model()
+    try:
+        model_horizon = check_window_lengths(best_tft, windows)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid batch request: {e}"}), 400
+    df_final = storage.read(DAILY_DATA, mmap=True).sort_index()
 
-    historical_data = historical_data.replace({np.nan: None})
-    predicted_data = predicted_data.replace({np.nan: None})
+    # En preprocesiran izsek, ki pokrije vsa okna (model vedno napoveduje celoten horizont)
+    bounds = [prediction_window_bounds(encoder_length, model_horizon, cutoff) for cutoff, encoder_length, _ in windows]
+    preprocessor = get_tft_preprocessor(df_final, data_fingerprint.digest())
+    df_window = preprocessor.transform(df_final, min(start for start, _ in bounds), max(end for _, end in bounds))
 
-    return jsonify({
-        "historical": historical_data.to_dict(orient="records"),
-        "predicted": predicted_data.to_dict(orient="records"),
-    })
+    try:
+        forecasts = run_tft_batch_prediction(best_tft, df_window, windows, actuals=df_final["Close"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"forecasts": forecasts})
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus text exposition of this process' timers, counters and component stats."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    if "request_start" in g:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=endpoint,
+                                status=response.status_code)
+    return response
+
+@app.route("/model_stats")
+def model_stats():
+    return jsonify({**model_registry.stats(), "forecast_cache": forecast_cache.stats(),
+                    "inference": inference_datasets.stats(), "jobs": forecast_jobs.stats(),
+                    "responses": response_encoder.stats()})
 
 @app.errorhandler(404)
 def page_not_found(e):
     return jsonify({"error": "Page not found"}), 404
 
+if Config.PRELOAD_MODEL:
+    threading.Thread(target=preload_model, daemon=True).start()
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
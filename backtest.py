@@ -0,0 +1,183 @@
+"""
+Rolling-origin backtest of the TFT model over daily_data.
+
+Cutoffs (prediction starts) are generated every `step` days from `start` up to the last date whose full horizon
+is already realized. They are forecast in chunks by a pool of worker processes, each of which memory-maps the same
+daily_data (shared page cache, no per-worker copy) and runs a chunk as one batched forecast.
+
+Every cutoff is forecast point-in-time: the preprocessor (Volume clip bounds, scaler) is fitted on the rows before
+the cutoff only, and the window is built from those rows plus, for the horizon, only the covariates known in
+advance (calendar and holiday columns); Close and every other feature are unknown after the cutoff. Rolling and
+resampled features and gap interpolation therefore never see data from after the cutoff. Every forecast day is
+scored with the pinball loss of the 0.05/0.5/0.85 quantiles and whether the realized Close fell inside the
+0.05-0.85 interval.
+
+Results are stored columnar through the storage backend (Data/Backtests/<run>), one row per (cutoff, step), and
+written after every chunk. A run is identified by the served model's checkpoint digest and the window lengths, so
+rerunning it (e.g. daily) only computes cutoffs that are not in the stored results yet.
+Usage: python backtest.py [--start 2022-01-01] [--step 7] [--encoder 31] [--horizon 31] [--workers 4]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+from data_processing import TFTPreprocessor
+from data_util.storage_util import get_storage
+from predict import (_load_checkpoint, configure_torch_threads, model_registry, prediction_window_bounds,
+                     resolve_model_path, run_tft_batch_prediction)
+
+DATA_PATH = "Data"
+DAILY_DATA = "daily_data"
+BACKTEST_DIR = "Backtests"
+QUANTILES = {"Lower_Bound": 0.05, "Predicted_Median": 0.5, "Upper_Bound": 0.85}
+# Columns of HolidayUtil.generate_holiday_dataframe: known for future dates at forecast time
+KNOWN_FUTURE_COLS = ["US", "UK", "Japan", "China", "day", "month", "time_idx", "is_weekend", "Halving"]
+
+
+def rolling_cutoffs(df, start, max_prediction_length, step=7, end=None):
+    """Prediction starts from `start` every `step` days whose whole horizon has a realized Close."""
+    last_close = df["Close"].last_valid_index()
+    last_cutoff = last_close - pd.Timedelta(days=max_prediction_length)
+    if end is not None:
+        last_cutoff = min(last_cutoff, pd.Timestamp(end))
+    return list(pd.date_range(pd.Timestamp(start), last_cutoff, freq=f"{step}D"))
+
+
+def pinball_loss(actual, predicted, quantile):
+    error = actual - predicted
+    return np.maximum(quantile * error, (quantile - 1) * error)
+
+
+def score(forecasts):
+    """One row per forecast day: quantiles, realized Close, pinball loss per quantile and interval coverage."""
+    rows = []
+    for forecast in forecasts:
+        frame = pd.DataFrame({
+            "Date": pd.to_datetime(forecast["dates"]),
+            "cutoff": pd.Timestamp(forecast["prediction_start"]),
+            "step": np.arange(1, len(forecast["dates"]) + 1),
+            "Close": np.array([np.nan if value is None else value for value in forecast["Close"]], dtype=float),
+            **{col: np.asarray(forecast[col], dtype=float) for col in QUANTILES},
+        })
+        rows.append(frame)
+    df = pd.concat(rows, ignore_index=True)
+    for col, quantile in QUANTILES.items():
+        df[f"pinball_{quantile:g}"] = pinball_loss(df["Close"], df[col], quantile)
+    df["covered"] = ((df["Close"] >= df["Lower_Bound"]) & (df["Close"] <= df["Upper_Bound"])).astype(float)
+    df.loc[df["Close"].isna(), "covered"] = np.nan
+    return df.set_index("Date")
+
+
+# Per worker process state (set by _init_worker)
+_worker = {}
+
+
+def _init_worker(model_path, root, num_threads):
+    configure_torch_threads(num_threads)
+    storage = get_storage(root)
+    _worker["model"] = _load_checkpoint(model_path)
+    _worker["df"] = storage.read(DAILY_DATA, mmap=True).sort_index()
+
+
+def point_in_time_window(df, cutoff, max_encoder_length, max_prediction_length):
+    """
+    Preprocessed window of a cutoff using only what was known before it: the preprocessor is fitted on the
+    rows before the cutoff and the horizon rows carry only KNOWN_FUTURE_COLS (everything else NaN).
+    """
+    window_start, window_end = prediction_window_bounds(max_encoder_length, max_prediction_length, cutoff)
+    history = df[df.index < cutoff]
+    horizon = df[(df.index >= cutoff) & (df.index <= window_end)]
+    known = [col for col in KNOWN_FUTURE_COLS if col in df.columns]
+    frame = pd.concat([history, horizon[known].reindex(columns=df.columns)])
+    preprocessor = TFTPreprocessor().fit(history)
+    return preprocessor.transform(frame, window_start, window_end)
+
+
+def _run_chunk(cutoffs, max_encoder_length, max_prediction_length):
+    df = _worker["df"]
+    windows = [(cutoff, max_encoder_length, max_prediction_length) for cutoff in cutoffs]
+    # The model decodes its whole trained horizon; the frames have to reach its end
+    model_horizon = _worker["model"].dataset_parameters["max_prediction_length"]
+    frames = [point_in_time_window(df, cutoff, max_encoder_length, max(max_prediction_length, model_horizon))
+              for cutoff in cutoffs]
+    forecasts = run_tft_batch_prediction(_worker["model"], None, windows, actuals=df["Close"], frames=frames)
+    return score(forecasts)
+
+
+def run_name(model_digest, max_encoder_length, max_prediction_length):
+    # "pit": point-in-time preprocessing (runs stored without it used data from after the cutoffs)
+    return f"{BACKTEST_DIR}/tft_{model_digest[:12]}_{max_encoder_length}_{max_prediction_length}_pit"
+
+
+def run_backtest(start="2022-01-01", step=7, max_encoder_length=31, max_prediction_length=31, end=None,
+                 workers=None, chunk_size=32, root=DATA_PATH):
+    """
+    Computes the missing cutoffs of the run, stores the merged results and returns them.
+    Raises FileNotFoundError when the model checkpoint or daily_data is missing.
+    """
+    storage = get_storage(root)
+    model_path = resolve_model_path()
+    model_digest = model_registry.digest(model_path)
+    if model_digest is None:
+        raise FileNotFoundError(f"Model checkpoint not found: {model_path}")
+    if not storage.exists(DAILY_DATA):
+        raise FileNotFoundError(f"Daily data not found in {root}; run a data refresh first")
+    df = storage.read(DAILY_DATA, mmap=True).sort_index()
+    name = run_name(model_digest, max_encoder_length, max_prediction_length)
+
+    results = storage.read(name) if storage.exists(name) else None
+    done = set() if results is None else set(pd.DatetimeIndex(results["cutoff"]))
+    cutoffs = [cutoff for cutoff in rolling_cutoffs(df, start, max_prediction_length, step, end) if cutoff not in done]
+    print(f"Backtest {name}: {len(done)} cutoffs stored, {len(cutoffs)} to compute.")
+    if not cutoffs:
+        return results
+
+    chunks = [cutoffs[i:i + chunk_size] for i in range(0, len(cutoffs), chunk_size)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    # fork: spawn would re-import the Flask app; the model is loaded inside each worker, after the fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork"), initializer=_init_worker,
+                             initargs=(model_path, root, num_threads)) as executor:
+        futures = [executor.submit(_run_chunk, chunk, max_encoder_length, max_prediction_length) for chunk in chunks]
+        for i, future in enumerate(as_completed(futures), start=1):
+            scored = future.result()
+            results = scored if results is None else pd.concat([results, scored])
+            # Checkpoint after every chunk so an interrupted run resumes where it stopped
+            storage.write(name, results.sort_values(["cutoff", "step"], kind="stable"))
+            print(f"Chunk {i}/{len(chunks)} done ({scored['cutoff'].nunique()} cutoffs).")
+
+    return storage.read(name)
+
+
+def summarize(results):
+    """Mean pinball losses and interval coverage per forecast step, plus an overall row."""
+    metrics = [f"pinball_{quantile:g}" for quantile in QUANTILES.values()] + ["covered"]
+    summary = results.groupby("step")[metrics].mean()
+    summary.loc["all"] = results[metrics].mean()
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the TFT model.")
+    parser.add_argument("--start", default="2022-01-01")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--step", type=int, default=7, help="Days between cutoffs")
+    parser.add_argument("--encoder", type=int, default=31)
+    parser.add_argument("--horizon", type=int, default=31)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=32)
+    parser.add_argument("--root", default=DATA_PATH)
+    args = parser.parse_args()
+
+    try:
+        results = run_backtest(args.start, args.step, args.encoder, args.horizon, args.end, args.workers,
+                               args.chunk_size, args.root)
+    except FileNotFoundError as e:
+        sys.exit(f"Backtest not started: {e}")
+    if results is not None:
+        print(summarize(results).to_string())
@@ -1,12 +1,15 @@
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
-from statsmodels.tsa.stattools import grangercausalitytests
 from copy import deepcopy as dc
-from data_util import TransformUtil, BTC
+from data_util import TransformUtil, BTC, GrangerUtil
+from data_util.frame_util import columns_frame, to_daily
+from data_util.metrics_util import timed
 from tqdm import tqdm
 from datetime import datetime
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import os
 
 # Definicija kategorij
 bea_category_names = {
@@ -20,20 +23,25 @@ bea_category_names = {
     "T8": "Financial and Corporate Data"
 }
 
+@timed("process_bea_data")
 def process_bea_data(bea, df_btc, min_date="2015-01-01", explained_var=0.9, nan_threshold=0.7):
-    df_indices = pd.DataFrame(index=pd.date_range(start="2000-01-01", end="2030-12-31", freq="QS"))
-    df_indices.index.name = "Date"
-    df_bea_orig = pd.DataFrame(index=pd.date_range(start="2000-01-01", end="2030-12-31", freq="D"))
-    df_bea_orig.index.name = "Date"
+    # Originalni podatki ostanejo v izvorni (četrtletni/mesečni) frekvenci
+    bea_orig_columns = {}
 
     significant_features_df = pd.read_csv("Data/BEA/significant_features_BEA_cleaned.csv")
     category_results = {}
 
+    # Tabele prenašamo vzporedno; omejitve BEA API-ja upošteva rate limiter v BEA razredu
+    tables = significant_features_df["Table"].unique()
+    with ThreadPoolExecutor(max_workers=bea.max_workers) as executor:
+        futures = {table: executor.submit(bea.fetch_data, table) for table in tables}
+        for _ in tqdm(as_completed(futures.values()), total=len(futures), desc="Fetching BEA Data"):
+            pass
+
     for (category, table), group in tqdm(significant_features_df.groupby(["Category", "Table"]),
                                          desc="Processing BEA Data"):
         try:
-            df = bea.fetch_data(table)
-            time.sleep(5)
+            df = futures[table].result()
 
             df = df[df.index >= min_date]
             if df.empty:
@@ -57,7 +65,7 @@ def process_bea_data(bea, df_btc, min_date="2015-01-01", explained_var=0.9, nan_
                 for col in df_filtered.columns:
                     best_lag = group[group["Column"] == col]["Best Lag"].values[0]
                     df_filtered.loc[:, col] = df_filtered[col].shift(int(best_lag))
-                    df_bea_orig.loc[df_filtered.index, col] = df_pivot[col]
+                    bea_orig_columns[col] = df_pivot[col]
 
                 table_results.append(df_filtered)
 
@@ -69,6 +77,7 @@ def process_bea_data(bea, df_btc, min_date="2015-01-01", explained_var=0.9, nan_
         except Exception as e:
             print(f"Error processing {table}: {e}")
 
+    indicators = {}
     for category, final_df in category_results.items():
         print(f"Processing category: {category}")
 
@@ -87,16 +96,23 @@ def process_bea_data(bea, df_btc, min_date="2015-01-01", explained_var=0.9, nan_
             print(f"Preskakujem {category}: Vsi podatki po PCA so preveč manjkajoči!")
             continue  # Pojdi na naslednjo kategorijo
 
-        df_tmp_pca_indicator = df_tmp_pca_indicator.asfreq("QS-OCT")
-        best_lag = best_granger_lag(df_tmp_pca_indicator, df_btc, "Close")
-
-        df_indices.loc[:, bea_category_names[category]] = df_tmp_pca_indicator
-        df_indices.loc[:, bea_category_names[category]] = df_indices[bea_category_names[category]].shift(best_lag)
-
-    df_indices = remove_fully_nan_rows(df_indices)
-    df_indices = df_indices.resample("D").interpolate(method="linear", limit_direction="both")
+        indicators[bea_category_names[category]] = df_tmp_pca_indicator.asfreq("QS-OCT")
+
+    # Granger lagi za vse kategorije naenkrat
+    shifted = {}
+    if indicators:
+        df_all_indicators = pd.concat({name: ind.iloc[:, 0] for name, ind in indicators.items()}, axis=1)
+        best_lags = GrangerUtil.best_lags(df_all_indicators.rename_axis("Date"), df_btc, "Close")
+        for name, df_tmp_pca_indicator in indicators.items():
+            # Zamik po četrtletni mreži (podaljša serijo v prihodnja četrtletja)
+            shifted[name] = df_tmp_pca_indicator.iloc[:, 0].shift(best_lags[name], freq="QS")
+
+    df_indices = columns_frame(shifted)
+    if not df_indices.empty:
+        df_indices = remove_fully_nan_rows(df_indices)
+        df_indices = df_indices.resample("D").interpolate(method="linear", limit_direction="both")
     print("All BEA categories processed successfully.")
-    return df_indices, df_bea_orig
+    return df_indices, columns_frame(bea_orig_columns)
 
 def drop_cols_with_nan(df, tresh=0.7):
     print(f"Number of cols before dropping NaNs: {len(df.columns)}")
@@ -109,26 +125,9 @@ def best_granger_lag(df1, df_btc, target_col, max_lag=5):
     if df1.index.name != "Date" or df_btc.index.name != "Date":
         raise ValueError("Both df1 and df_btc must have 'Date' as index")
 
-    merged_df = df_btc[[target_col]].merge(df1, on="Date", how="inner")
-    merged_df.replace([float("inf"), float("-inf")], float("nan"), inplace=True)
-    merged_df.dropna(inplace=True)
-
-    if len(merged_df) < max_lag + 1:
-        return None
-
+    # Grangerjev test (batched implementation, see GrangerUtil.best_lags for several columns at once)
     feature_col = df1.columns[0]
-
-    # Grangerjev test
-    best_lag, best_p_value = None, 1.0
-    test_results = grangercausalitytests(merged_df[[feature_col, target_col]], max_lag, verbose=False)
-
-    for lag, results in test_results.items():
-        p_value = results[0]['ssr_chi2test'][1]
-        if p_value < best_p_value:
-            best_p_value = p_value
-            best_lag = lag
-
-    return best_lag
+    return GrangerUtil.best_lags(df1[[feature_col]], df_btc, target_col, max_lag=max_lag)[feature_col]
 
 def remove_fully_nan_rows(df):
     first_valid_index = df.notna().any(axis=1).idxmax()
@@ -138,6 +137,7 @@ def remove_fully_nan_rows(df):
 
     return df
 
+@timed("process_fred_data")
 def process_fred_data(fred, df_btc):
     end_date = datetime.today().strftime('%Y-%m-%d')
 
@@ -154,24 +154,24 @@ def process_fred_data(fred, df_btc):
         print("Warning: Some FRED data is missing! Skipping processing.")
         return pd.DataFrame()
 
-    df_fred_indices = pd.DataFrame(index=pd.date_range(start=df_monthly.index.min(), end="2026-12-31", freq="D"))
-    df_fred_indices.index.name = "Date"
+    fred_columns = {}
 
     btc_monthly = df_btc.resample("MS").mean().dropna()
 
+    monthly_lags = GrangerUtil.best_lags(df_monthly, btc_monthly, "Close")
     for col in df_monthly.columns:
-        best_lag = best_granger_lag(df_monthly[[col]], btc_monthly, "Close")
+        best_lag = monthly_lags[col]
         print(f"Monthly Lag: {best_lag} | Column: {col}")
-        df_fred_indices[col] = df_monthly[col].shift(best_lag)
+        fred_columns[col] = df_monthly[col].shift(best_lag)
 
+    daily_lags = GrangerUtil.best_lags(df_daily, df_btc, "Close")
     for col in df_daily.columns:
-        best_lag = best_granger_lag(df_daily[[col]], df_btc, "Close")
+        best_lag = daily_lags[col]
         print(f"Daily Lag: {best_lag} | Column: {col}")
-        df_fred_indices[col] = df_daily[col].shift(best_lag)
-
-    print("FRED Indices Before Cleaning:", df_fred_indices.tail())
+        fred_columns[col] = df_daily[col].shift(best_lag)
 
-    df_fred_indices = remove_fully_nan_rows(df_fred_indices)
+    # Serije v izvorni frekvenci, poravnane na dnevno mrežo od prve do zadnje vrednosti
+    df_fred_indices = to_daily(columns_frame(fred_columns))
     print("FRED Indices After Cleaning:", df_fred_indices.tail())
 
     df_fred_indices = df_fred_indices.interpolate(method="linear", limit_direction="both")
@@ -180,20 +180,15 @@ def process_fred_data(fred, df_btc):
     return df_fred_indices, df_fred_orig
 
 
+@timed("process_bitcoin_data")
 def process_bitcoin_data(df_btc, explained_var=0.9):
     df_btc_indices_tmp = BTC.generate_bitcoin_indicators(explained_var)
     df_btc_indices_tmp = df_btc_indices_tmp.interpolate(method="linear", limit_direction="both")
     df_btc_indices_tmp.index.name = "Date"
 
-    df_btc_indices = pd.DataFrame(index=pd.date_range(start=df_btc_indices_tmp.index.min(), end="2026-12-31", freq="D"))
-    df_btc_indices.index.name = "Date"
-
-    for col in df_btc_indices_tmp.columns:
-        best_lag = best_granger_lag(df_btc_indices_tmp[[col]], df_btc, "Close")
-
-        if best_lag is not None:
-            df_btc_indices[col] = df_btc_indices_tmp[col].shift(best_lag)
-    df_btc_indices = remove_fully_nan_rows(df_btc_indices)
+    best_lags = GrangerUtil.best_lags(df_btc_indices_tmp, df_btc, "Close")
+    df_btc_indices = to_daily(columns_frame({col: df_btc_indices_tmp[col].shift(best_lags[col])
+                                             for col in df_btc_indices_tmp.columns if best_lags[col] is not None}))
     df_btc_indices = df_btc_indices.interpolate(method="linear", limit_direction="both")
 
     return df_btc_indices
@@ -201,60 +196,208 @@ def process_bitcoin_data(df_btc, explained_var=0.9):
 def get_today():
     return datetime.today().strftime('%Y-%m-%d')
 
+# Odstranimo podvojene stolpce v seznamu
+TFT_COLS_2_SCALE = [
+    'Volume', "Volume_weekly", "Volume_monthly", "MA7", "MA111", "MA200",
+    'High', 'Low', 'Open', 'BTC_miners', 'BTC_transactions', 'BTC_network',
+    'Unique Addresses Used', 'Number of Transactions', 'Transactions Per Second',
+    'Output Volume', 'Mempool Transaction Count', 'Mempool Size Growth',
+    'Mempool Size (Bytes)', 'Transactions Excluding Popular Addresses',
+    'Estimated Transaction Volume (BTC)', 'Estimated Transaction Volume (USD)',
+    'Miners Revenue (USD)', 'Transaction Fees (BTC)', 'Transaction Fees (USD)',
+    'Cost per Transaction (%)', 'Cost per Transaction (USD)', 'Network Difficulty',
+    'Hash Rate (TH/s)', 'Block Size', 'Average Block Size', 'Transactions per Block',
+    'Trade Volume', 'Total Bitcoins', 'Market Cap', 'M2SL', 'FEDFUNDS',
+    'IRLTLT01JPM156N', 'CPIAUCSL', 'PAYEMS', 'GEPUCURRENT', 'USEPUINDXD',
+    'EPUMONETARY', 'APU000072610', 'DTWEXBGS', 'DGS10', 'DGS2', 'DFF', 'VIXCLS',
+    'WLEMUINDXD', 'T10Y2Y', 'T10Y3M', 'T10YIE',  'IBIT', 'FBTC', 'BITB', 'ARKB', 'BTCO',
+   'EZBC', 'BRRR', 'HODL', 'BTCW', 'GBTC', 'BTC', 'Total'
+]
+
+# Seznam kategorijskih spremenljivk
+TFT_CATEGORICAL_COLS = ['US', 'UK', 'Japan', 'China', 'day', 'month', 'time_idx', 'is_weekend', 'Halving', 'group']
+
+
+class TFTPreprocessor:
+    """
+    Fit/transform split of preprocess_for_tft.
+
+    `fit` runs once per data version on the full history and keeps only the parameters (Volume clip
+    bounds, scaler mean/scale). `transform` materializes just the requested date window: rolling and
+    resampled features are computed on a warm-up margin before (and a short tail after) the window, and gaps that extend past
+    the window edges are interpolated from the nearest observations outside it, so the window is
+    identical to the same rows of the full-history preprocess_for_tft.
+    """
+
+    STATE_PATH = "Data/Cache/tft_preprocessor.json"
+    ENGINEERED_COLS = ["Volume_weekly", "Volume_monthly", "MA7", "MA111", "MA200"]
+    # MA200 needs 199 preceding rows; the rest covers the first (partial) monthly resample bucket
+    WARMUP_ROWS = 400
+    # Weekly/monthly aggregates are interpolated towards the next bucket label, at most a month ahead
+    TAIL_ROWS = 62
+
+    def __init__(self, params=None):
+        self.params = params
+
+    @timed("tft_preprocessor_fit")
+    def fit(self, df, version=None):
+        df = df.copy()
+        # Clip Volume na 5% in 95% percentil
+        lower_bound, upper_bound = np.percentile(df["Volume"].dropna(), [5, 95])
+        df = self._add_features(df, lower_bound, upper_bound)
+
+        # Odstranimo manjkajoče stolpce pred skaliranjem
+        cols_2_scale = [col for col in TFT_COLS_2_SCALE if col in df.columns]
+        scaler = StandardScaler().fit(df[cols_2_scale])
+
+        self.params = {
+            "version": version,
+            "volume_bounds": [float(lower_bound), float(upper_bound)],
+            "scale_cols": cols_2_scale,
+            "mean": scaler.mean_.tolist(),
+            "scale": scaler.scale_.tolist(),
+        }
+        return self
+
+    def save(self, path=None):
+        path = path or self.STATE_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.params, f)
+        os.replace(tmp_path, path)
+        return self
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or cls.STATE_PATH
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _add_features(df, lower_bound, upper_bound):
+        df["Volume"] = np.clip(df["Volume"], lower_bound, upper_bound)
+
+        # Agregacije Volume (resample zahteva datetime index)
+        if df.index.inferred_type == "datetime64":
+            df["Volume_weekly"] = df["Volume"].resample("W").mean()
+            df["Volume_monthly"] = df["Volume"].resample("ME").mean()
+        else:
+            print("Napaka: Index ni v datetime formatu!")
+
+        # Drseča povprečja
+        df["MA7"] = df["Close"].rolling(7, min_periods=1).mean()
+        df["MA111"] = df["Close"].rolling(111, min_periods=1).mean()
+        df["MA200"] = df["Close"].rolling(200, min_periods=1).mean()
+        return df
+
+    def _pointwise(self, col):
+        """Clip/scale applied to a single raw column (the parts of the pipeline that act per value)."""
+        lower_bound, upper_bound = self.params["volume_bounds"]
+        scale_cols = self.params["scale_cols"]
+        position = scale_cols.index(col) if col in scale_cols else None
+
+        def apply(values):
+            if col == "Volume":
+                values = np.clip(values, lower_bound, upper_bound)
+            if position is not None:
+                values = (values - self.params["mean"][position]) / self.params["scale"][position]
+            return values
+        return apply
+
+    @timed("tft_preprocessor_transform")
+    def transform(self, df, start=None, end=None):
+        """Preprocesses the rows of df between start and end (inclusive; None = open ended)."""
+        lower_bound, upper_bound = self.params["volume_bounds"]
+        first = 0 if start is None else df.index.searchsorted(pd.Timestamp(start), side="left")
+        last = len(df) if end is None else df.index.searchsorted(pd.Timestamp(end), side="right")
+        margin_start = max(0, first - self.WARMUP_ROWS)
+        stop = min(len(df), last + self.TAIL_ROWS)
+
+        out = self._add_features(df.iloc[margin_start:stop].copy(), lower_bound, upper_bound)
+
+        # Skaliranje numeričnih podatkov s parametri iz fit
+        cols_2_scale = [col for col in self.params["scale_cols"] if col in out.columns]
+        positions = [self.params["scale_cols"].index(col) for col in cols_2_scale]
+        out[cols_2_scale] = (out[cols_2_scale].to_numpy(dtype=np.float64) - np.asarray(self.params["mean"])[positions]) \
+            / np.asarray(self.params["scale"])[positions]
+
+        if margin_start > 0 or stop < len(df):
+            self._fill_edges(out, df, margin_start, stop)
+
+        # Interpolacija manjkajočih vrednosti
+        out = out.infer_objects(copy=False)
+        numeric_cols = out.select_dtypes("number").columns
+        out[numeric_cols] = out[numeric_cols].interpolate(method="linear", limit_direction="both")
+        out = out.iloc[first - margin_start:last - margin_start]
+
+        # Dodaj stolpec 'group'
+        out["group"] = "BTC"
+
+        categorical_cols = [col for col in TFT_CATEGORICAL_COLS if col in out.columns]
+        out['time_idx'] = out['time_idx'].astype(int)
+        # Pretvorba v kategorijo
+        out[categorical_cols] = out[categorical_cols].astype(str).astype("category")
+
+        return out
+
+    def _fill_edges(self, out, df, margin_start, stop):
+        """
+        Fills NaN runs touching the slice edges the way a positional linear interpolation over the full
+        history would: between the nearest valid (transformed) values before and after the slice.
+        """
+        for col in out.columns:
+            if col in self.ENGINEERED_COLS or col not in df.columns or not pd.api.types.is_float_dtype(out[col].dtype):
+                continue
+            values = out[col].to_numpy(dtype=np.float64, copy=True)
+            if not (np.isnan(values[0]) or np.isnan(values[-1])):
+                continue
+
+            full = df[col].to_numpy(dtype=np.float64)
+            transform = self._pointwise(col)
+            valid = np.flatnonzero(~np.isnan(values))
+            before = np.flatnonzero(~np.isnan(full[:margin_start]))
+            after = np.flatnonzero(~np.isnan(full[stop:]))
+            positions = np.arange(margin_start, stop)
+
+            # Anchors as (global position, transformed value)
+            left = (before[-1], transform(full[before[-1]])) if len(before) else None
+            right = (stop + after[0], transform(full[stop + after[0]])) if len(after) else None
+
+            if np.isnan(values[0]) and left is not None:
+                head_end = valid[0] if len(valid) else len(values)
+                head_right = (margin_start + valid[0], values[valid[0]]) if len(valid) else right
+                values[:head_end] = self._interpolate(positions[:head_end], left, head_right)
+            elif np.isnan(values[0]) and right is not None and not len(valid):
+                values[:] = right[1]  # Nothing before: back-filled from the first value after the slice
+            if np.isnan(values[-1]) and right is not None and len(valid):
+                tail_left = (margin_start + valid[-1], values[valid[-1]])
+                values[valid[-1] + 1:] = self._interpolate(positions[valid[-1] + 1:], tail_left, right)
+            out[col] = values
+
+    @staticmethod
+    def _interpolate(positions, left, right):
+        if right is None:
+            return np.full(len(positions), left[1])
+        (p0, v0), (p1, v1) = left, right
+        return v0 + (v1 - v0) * (positions - p0) / (p1 - p0)
+
+
+def get_tft_preprocessor(df, version):
+    """Returns the fitted preprocessor of a data version, fitting and persisting it on first use."""
+    preprocessor = _tft_preprocessors.get(version) or TFTPreprocessor.load()
+    if preprocessor is None or preprocessor.params.get("version") != version:
+        preprocessor = TFTPreprocessor().fit(df, version).save()
+    _tft_preprocessors.clear()
+    _tft_preprocessors[version] = preprocessor
+    return preprocessor
+
+_tft_preprocessors = {}
+
+
+@timed("preprocess_for_tft")
 def preprocess_for_tft(df):
-    # Clip Volume na 5% in 95% percentil
-    lower_bound, upper_bound = np.percentile(df["Volume"].dropna(), [5, 95])
-    df["Volume"] = np.clip(df["Volume"], lower_bound, upper_bound)
-
-    # Agregacije Volume (resample zahteva datetime index)
-    if df.index.inferred_type == "datetime64":
-        df["Volume_weekly"] = df["Volume"].resample("W").mean()
-        df["Volume_monthly"] = df["Volume"].resample("ME").mean()
-    else:
-        print("Napaka: Index ni v datetime formatu!")
-
-    # Drseča povprečja
-    df["MA7"] = df["Close"].rolling(7, min_periods=1).mean()
-    df["MA111"] = df["Close"].rolling(111, min_periods=1).mean()
-    df["MA200"] = df["Close"].rolling(200, min_periods=1).mean()
-
-    # Odstranimo podvojene stolpce v seznamu
-    cols_2_scale = [
-        'Volume', "Volume_weekly", "Volume_monthly", "MA7", "MA111", "MA200",
-        'High', 'Low', 'Open', 'BTC_miners', 'BTC_transactions', 'BTC_network',
-        'Unique Addresses Used', 'Number of Transactions', 'Transactions Per Second',
-        'Output Volume', 'Mempool Transaction Count', 'Mempool Size Growth',
-        'Mempool Size (Bytes)', 'Transactions Excluding Popular Addresses',
-        'Estimated Transaction Volume (BTC)', 'Estimated Transaction Volume (USD)',
-        'Miners Revenue (USD)', 'Transaction Fees (BTC)', 'Transaction Fees (USD)',
-        'Cost per Transaction (%)', 'Cost per Transaction (USD)', 'Network Difficulty',
-        'Hash Rate (TH/s)', 'Block Size', 'Average Block Size', 'Transactions per Block',
-        'Trade Volume', 'Total Bitcoins', 'Market Cap', 'M2SL', 'FEDFUNDS',
-        'IRLTLT01JPM156N', 'CPIAUCSL', 'PAYEMS', 'GEPUCURRENT', 'USEPUINDXD',
-        'EPUMONETARY', 'APU000072610', 'DTWEXBGS', 'DGS10', 'DGS2', 'DFF', 'VIXCLS',
-        'WLEMUINDXD', 'T10Y2Y', 'T10Y3M', 'T10YIE',  'IBIT', 'FBTC', 'BITB', 'ARKB', 'BTCO',
-       'EZBC', 'BRRR', 'HODL', 'BTCW', 'GBTC', 'BTC', 'Total'
-    ]
-
-    # Odstranimo manjkajoče stolpce pred skaliranjem
-    cols_2_scale = [col for col in cols_2_scale if col in df.columns]
-
-    # Skaliranje numeričnih podatkov
-    scaler = StandardScaler()
-    df[cols_2_scale] = scaler.fit_transform(df[cols_2_scale])
-
-    # Interpolacija manjkajočih vrednosti
-    df = df.infer_objects(copy=False)
-    df = df.interpolate(method="linear", limit_direction="both")
-
-    # Dodaj stolpec 'group'
-    df["group"] = "BTC"
-
-    # Seznam kategorijskih spremenljivk (filtriraj obstoječe stolpce)
-    categorical_cols = ['US', 'UK', 'Japan', 'China', 'day', 'month', 'time_idx', 'is_weekend', 'Halving', 'group']
-    categorical_cols = [col for col in categorical_cols if col in df.columns]
-    df['time_idx'] = df['time_idx'].astype(int)
-    # Pretvorba v kategorijo
-    df[categorical_cols] = df[categorical_cols].astype(str).astype("category")
-
-    return df
\ No newline at end of file
+    """Full-history preprocessing (fit + transform of every row)."""
+    return TFTPreprocessor().fit(df).transform(df)
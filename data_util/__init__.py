@@ -4,4 +4,5 @@ from .api.bea_api import BEA
 from .api.bls_api import BLS
 from .api.btc_api import BTC
 from .api.trends_api import TRENDS
-from .transform_util import TransformUtil
\ No newline at end of file
+from .transform_util import TransformUtil
+from .granger_util import GrangerUtil
\ No newline at end of file
@@ -1,36 +1,71 @@
-import requests
 import pandas as pd
+import json
+import os
 import re
-from requests.adapters import HTTPAdapter
+import threading
 from urllib3.util.retry import Retry
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 from ..config import Config
+from ..cache_util import RefreshCache
+from ..series_util import get_series_cache
+from ..http_util import SlidingWindowLimit, transport
 
 
 class BEA:
     BASE_URL = "https://apps.bea.gov/api/data/"
+    FREQUENCIES_PATH = "Data/BEA/table_frequencies.json"
 
-    def __init__(self):
+    # BEA API limits per UserID: 100 requests, 100 MB and 30 errors per minute (exceeding them locks
+    # the key out for an hour). Sliding 60 s windows, so no minute ever exceeds them; shared by all
+    # instances and threads of this process. Volume and errors are only known after a response, so
+    # their limits leave headroom for the requests in flight (up to max_workers).
+    request_limit = SlidingWindowLimit(100, window=60)
+    volume_limit = SlidingWindowLimit(80 * 2 ** 20, window=60)
+    error_limit = SlidingWindowLimit(30 - 8, window=60)
+
+    def __init__(self, max_workers=4):
         self.api_key = Config.BEA_API_KEY
-        self.session = requests.Session()
+        self.max_workers = max_workers
         retries = Retry(total=5, backoff_factor=1, status_forcelist=[500, 502, 503, 504], respect_retry_after_header=False )
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
+        transport.configure("apps.bea.gov", retry=retries, pool_maxsize=max_workers)
+        self._frequencies_lock = threading.Lock()
+        self.table_frequencies = self._load_table_frequencies()
 
     def _get_response(self, url):
-        response = self.session.get(url, verify=False)  # Disable SSL verification if needed
+        # Wait for a request token and until earlier responses/errors are paid off
+        self.error_limit.acquire(0)
+        self.volume_limit.acquire(0)
+        self.request_limit.acquire()
+
+        response = transport.get(url, verify=False)  # Disable SSL verification if needed
+        self.volume_limit.consume(len(response.content))
         if response.status_code != 200:
+            self.error_limit.consume(1)
             raise ConnectionError(f"API request failed with status code {response.status_code}")
         return response.json()
 
+    def _load_table_frequencies(self):
+        if not os.path.exists(self.FREQUENCIES_PATH):
+            return {}
+        with open(self.FREQUENCIES_PATH) as f:
+            return json.load(f)
+
+    def _remember_frequency(self, dataset_name, table_name, freq):
+        key = f"{dataset_name}/{table_name}"
+        with self._frequencies_lock:
+            if self.table_frequencies.get(key) == freq:
+                return
+            self.table_frequencies[key] = freq
+            os.makedirs(os.path.dirname(self.FREQUENCIES_PATH), exist_ok=True)
+            tmp_path = f"{self.FREQUENCIES_PATH}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.table_frequencies, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.FREQUENCIES_PATH)
+
     def get_tables(self, dataset_name="NIPA"):
         url = f"{self.BASE_URL}?UserID={self.api_key}&method=GetParameterValues&datasetname={dataset_name}&ParameterName=TableName&ResultFormat=json"
-        response = self.session.get(url, verify=False)
-
-        if response.status_code != 200:
-            raise ConnectionError(f"API request failed with status code {response.status_code}")
-
-        data = response.json()
+        data = self._get_response(url)
 
         # DEBUG: Izpiši celoten API odgovor
         print("BEA API Response:", data)
@@ -57,34 +92,68 @@ class BEA:
             return pd.to_datetime(date_str, format="%Y")
         return pd.NaT  # Invalid value
 
+    @staticmethod
+    def _years_since(start):
+        """BEA Year parameter covering `start` up to the current year (ALL when start is None)."""
+        if start is None:
+            return "ALL"
+        return ",".join(str(y) for y in range(start.year, pd.Timestamp.today().year + 1))
+
+    def _fetch_table(self, table_name, dataset_name, freq, year, processed=True):
+        url = f"{self.BASE_URL}?UserID={self.api_key}&method=GetData&datasetname={dataset_name}&TableName={table_name}&Frequency={freq}&Year={year}&ResultFormat=json"
+        data = self._get_response(url)
+
+        if "BEAAPI" not in data or "Results" not in data["BEAAPI"] or "Data" not in data["BEAAPI"]["Results"]:
+            return None
+
+        df = pd.DataFrame(data["BEAAPI"]["Results"]["Data"])
+
+        if not processed:
+            return df  # Return raw data
+
+        # Process the data
+        df = df[["TimePeriod", "LineDescription", "DataValue", "METRIC_NAME"]].rename(
+            columns={"TimePeriod": "Date"}
+        )
+        df["Date"] = df["Date"].apply(self.parse_date)
+        df["DataValue"] = df["DataValue"].str.replace(",", "").astype(float)
+
+        # Pivot data so that each unique combination of LineDescription and METRIC_NAME becomes a column
+        df_pivot = df.pivot_table(index="Date", columns=["LineDescription", "METRIC_NAME"], values="DataValue",
+                                  aggfunc="mean")
+        df_pivot.sort_index(inplace=True)
+        df_pivot.index.name = "Date"
+        return df_pivot
+
+    @RefreshCache.source("bea", skip_self=True)
     def fetch_data(self, table_name, dataset_name="NIPA", frequencies=["M", "Q", "A"], year="ALL", processed=True,
                    metric_filter=None):
         """
         Fetches data for a specific table from the BEA API with a fallback frequency mechanism.
+        Full-history requests of processed data go through the local series cache, so only the years
+        inside the revision look-back window are downloaded once the table is cached. The frequency that
+        worked for a table is remembered (Data/BEA/table_frequencies.json) and tried first next time.
         """
-        for freq in frequencies:
-            url = f"{self.BASE_URL}?UserID={self.api_key}&method=GetData&datasetname={dataset_name}&TableName={table_name}&Frequency={freq}&Year={year}&ResultFormat=json"
-            data = self._get_response(url)
+        known = self.table_frequencies.get(f"{dataset_name}/{table_name}")
+        if known in frequencies:
+            frequencies = [known] + [freq for freq in frequencies if freq != known]
 
-            if "BEAAPI" not in data or "Results" not in data["BEAAPI"] or "Data" not in data["BEAAPI"]["Results"]:
+        for freq in frequencies:
+            if processed and year == "ALL":
+                df_pivot = get_series_cache().update(
+                    f"bea/{dataset_name}/{table_name}/{freq}",
+                    lambda start, freq=freq: self._fetch_table(table_name, dataset_name, freq, self._years_since(start)),
+                    lookback_days=Config.REVISION_LOOKBACK_DAYS["bea"],
+                )
+            else:
+                df_pivot = self._fetch_table(table_name, dataset_name, freq, year, processed)
+
+            if df_pivot is None:
                 continue  # Try the next frequency
-
-            df = pd.DataFrame(data["BEAAPI"]["Results"]["Data"])
+            self._remember_frequency(dataset_name, table_name, freq)
 
             if not processed:
-                return df  # Return raw data
-
-            # Process the data
-            df = df[["TimePeriod", "LineDescription", "DataValue", "METRIC_NAME"]].rename(
-                columns={"TimePeriod": "Date"}
-            )
-            df["Date"] = df["Date"].apply(self.parse_date)
-            df["DataValue"] = df["DataValue"].str.replace(",", "").astype(float)
-
-            # Pivot data so that each unique combination of LineDescription and METRIC_NAME becomes a column
-            df_pivot = df.pivot_table(index="Date", columns=["LineDescription", "METRIC_NAME"], values="DataValue",
-                                      aggfunc="mean")
-            df_pivot.sort_index(inplace=True)
+                return df_pivot  # Return raw data
 
             # Filter only columns where METRIC_NAME == "Fisher Quantity Index"
             if metric_filter:
@@ -1,6 +1,7 @@
-import requests
 import pandas as pd
 from ..config import Config
+from ..http_util import transport
+from ..metrics_util import fetch_timed
 
 class BLS:
     BASE_URL = "https://api.bls.gov/publicAPI/v2/timeseries/data/"
@@ -9,6 +10,7 @@ class BLS:
         self.api_key = Config.BLS_API_KEY
 
 
+    @fetch_timed("bls")
     def fetch_data(self, series_ids, start_year, end_year, processed=True):
         headers = {"Content-Type": "application/json"}
         payload = {
@@ -18,7 +20,7 @@ class BLS:
             "registrationkey": self.api_key
         }
 
-        response = requests.post(self.BASE_URL, json=payload, headers=headers)
+        response = transport.post(self.BASE_URL, json=payload, headers=headers)
 
         if response.status_code != 200:
             raise ConnectionError(f"API request failed with status code {response.status_code}")
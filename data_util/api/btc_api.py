@@ -3,16 +3,23 @@ import pandas as pd
 import yfinance as yf
 import requests
 import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
 from data_util.transform_util import TransformUtil
+from data_util.frame_util import columns_frame
+from data_util.http_util import TokenBucket, transport
+from data_util.cache_util import RefreshCache
+from data_util.series_util import get_series_cache
+from data_util.config import Config
 
 class BTC:
     @staticmethod
+    @RefreshCache.source("farside")
     def get_etf_flows():
         url = 'https://farside.co.uk/bitcoin-etf-flow-all-data/?t'
-        scraper = cloudscraper.create_scraper()
-        response = scraper.get(url)
+        transport.configure("farside.co.uk", session_factory=cloudscraper.create_scraper)
+        response = transport.get(url, cache=True)
         response.raise_for_status()
 
         html_content = io.StringIO(response.text)
@@ -37,19 +44,35 @@ class BTC:
         return df
 
     @staticmethod
+    @RefreshCache.source("yfinance")
     def get_crypto_data(ticker="BTC-USD", period="max", interval="1d"):
+        def fetch(start):
+            if start is None:
+                df = yf.download(ticker, period=period, interval=interval, auto_adjust=True, progress=False, multi_level_index=False)
+            else:
+                df = yf.download(ticker, start=start.strftime("%Y-%m-%d"), interval=interval, auto_adjust=True, progress=False, multi_level_index=False)
+            df.index = df.index.tz_localize(None)
+            df.index.name = "Date"
+            df = df[["Close", "High", "Low", "Open", "Volume"]]
+            return df.dropna()
+
         try:
-            df_btc = yf.download(ticker, period=period, interval=interval, auto_adjust=True, progress=False, multi_level_index=False)
-            df_btc.index = df_btc.index.tz_localize(None)
-            df_btc = df_btc[["Close", "High", "Low", "Open", "Volume"]]
-            df_btc.dropna(inplace=True)
-            return df_btc
+            if period != "max":
+                return fetch(None)
+            # Full history is served from the local cache, topped up with the last few days
+            return get_series_cache().update(f"yfinance/{ticker}/{interval}", fetch,
+                                             lookback_days=Config.REVISION_LOOKBACK_DAYS["yfinance"])
         except Exception as e:
             print(f"Error fetching data for {ticker}: {e}")
             return None
 
     @staticmethod
-    def get_bitcoin_indices():
+    @RefreshCache.source("blockchain.info")
+    def get_bitcoin_indices(max_workers=8, requests_per_second=5.0):
+        """
+        Fetches all blockchain.info charts concurrently (at most `max_workers` in flight, rate limited to
+        `requests_per_second` for the host) and aligns them in a single concat.
+        """
         endpoints = {
             "Unique Addresses Used": "https://api.blockchain.info/charts/n-unique-addresses?timespan=all&format=json",
             "Number of Transactions": "https://api.blockchain.info/charts/n-transactions?timespan=all&format=json",
@@ -76,43 +99,59 @@ class BTC:
             "Market Cap": "https://api.blockchain.info/charts/market-cap?timespan=all&format=json",
         }
 
-        def fetch_data(session, url, column_name):
+        transport.configure("api.blockchain.info", pool_maxsize=max_workers,
+                            rate_limit=TokenBucket(requests_per_second, capacity=max_workers))
+        series_cache = get_series_cache()
+
+        def fetch_data(url, column_name):
             try:
-                response = session.get(url, timeout=10)
+                response = transport.get(url, timeout=10)
                 response.raise_for_status()
                 data = response.json()
                 if 'values' not in data:
                     print(f"Warning: 'values' key not found in API response for {column_name}")
-                    return pd.DataFrame()
+                    return None
                 df = pd.DataFrame(data['values'])
-                df.rename(columns={'x': 'Date'}, inplace=True)
-                df['Date'] = pd.to_datetime(df['Date'], unit='s').dt.date
-                df.set_index('Date', inplace=True)
-                df.rename(columns={'y': column_name}, inplace=True)
-                return df
+                dates = pd.to_datetime(df['x'], unit='s').dt.normalize()
+                series = pd.Series(df['y'].to_numpy(), index=pd.DatetimeIndex(dates, name='Date'), name=column_name)
+                return series[~series.index.duplicated(keep="first")]
             except requests.RequestException as e:
                 print(f"Error fetching {column_name}: {e}")
-                return pd.DataFrame()
-
-        full_dates = pd.DataFrame(index=pd.date_range(start="2009-01-01", end="2026-12-31", freq="D"))
-        full_dates.index.name = "Date"
-
-        with requests.Session() as session:
-            df_combined = full_dates.copy()
-            for name, url in tqdm(endpoints.items(), desc="Fetching data", unit="endpoint"):
-                df = fetch_data(session, url, name)
-                if not df.empty:
-                    df_combined = df_combined.join(df, how='left')
-
-        df_combined = df_combined[~df_combined.index.duplicated(keep="first")].dropna(how="all")
+                return None
+
+        def fetch_chart(url, column_name):
+            def fetch(start):
+                if start is None:
+                    series = fetch_data(url, column_name)
+                else:
+                    days = (pd.Timestamp.today().normalize() - start).days + 1
+                    series = fetch_data(url.replace("timespan=all", f"timespan={days}days&start={start:%Y-%m-%d}"),
+                                        column_name)
+                return None if series is None else series.to_frame()
+
+            df = series_cache.update(f"blockchain.info/{column_name}", fetch,
+                                     lookback_days=Config.REVISION_LOOKBACK_DAYS["blockchain.info"])
+            return None if df is None else df[column_name]
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch_chart, url, name): name for name, url in endpoints.items()}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Fetching data", unit="endpoint"):
+                results[futures[future]] = future.result()
+
+        # Single alignment step, columns in endpoint order
+        series = [results[name] for name in endpoints if results.get(name) is not None and not results[name].empty]
+        if not series:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+        df_combined = pd.concat(series, axis=1).sort_index()
+        df_combined = df_combined.loc["2009-01-01":].dropna(how="all")
+        df_combined.index.name = "Date"
 
         return df_combined
 
     @staticmethod
     def generate_bitcoin_indicators(explained_var=.9):
         df_tmp = BTC.get_bitcoin_indices()
-        df_btc_indices = pd.DataFrame(index=pd.date_range(start=df_tmp.index.min(), end="2026-12-31", freq="D"))
-        df_btc_indices.index.name = "Date"
         transaction_indicators = [
             "Unique Addresses Used", "Number of Transactions", "Transactions Per Second",
             "Output Volume", "Transactions Excluding Popular Addresses",
@@ -131,16 +170,19 @@ class BTC:
             "Block Size", "Average Block Size", "Trade Volume", "Total Bitcoins", "Market Cap"
         ]
 
-        df_btc_indices["BTC_miners"] = TransformUtil.create_indicator("BTC_miners", df_tmp[mining_indicators],
-                                                                        scaler="standard", method="mean",
-                                                                        explained_var=explained_var)
-        df_btc_indices["BTC_transactions"] = TransformUtil.create_indicator("BTC_transactions",
-                                                                              df_tmp[transaction_indicators],
-                                                                              scaler="standard", method="mean",
-                                                                              explained_var=explained_var)
-        df_btc_indices["BTC_network"] = TransformUtil.create_indicator("BTC_network", df_tmp[network_indicators],
-                                                                         scaler="standard", method="mean",
-                                                                         explained_var=explained_var)
+        indicators = {}
+        indicators["BTC_miners"] = TransformUtil.create_indicator("BTC_miners", df_tmp[mining_indicators],
+                                                                    scaler="standard", method="mean",
+                                                                    explained_var=explained_var)
+        indicators["BTC_transactions"] = TransformUtil.create_indicator("BTC_transactions",
+                                                                          df_tmp[transaction_indicators],
+                                                                          scaler="standard", method="mean",
+                                                                          explained_var=explained_var)
+        indicators["BTC_network"] = TransformUtil.create_indicator("BTC_network", df_tmp[network_indicators],
+                                                                     scaler="standard", method="mean",
+                                                                     explained_var=explained_var)
+        # Indicators keep the native extent of the indices (no fixed calendar frame to merge into)
+        df_btc_indices = columns_frame({name: df.iloc[:, 0] for name, df in indicators.items()})
         df_btc_indices = df_btc_indices.dropna(how="all")
 
         return df_btc_indices
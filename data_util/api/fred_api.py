@@ -1,7 +1,8 @@
-import requests
 import pandas as pd
-from requests.adapters import HTTPAdapter, Retry
 from ..config import Config
+from ..http_util import transport
+from ..cache_util import RefreshCache
+from ..series_util import get_series_cache
 
 class FRED:
     BASE_URL = "https://api.stlouisfed.org/fred/series/observations"
@@ -9,30 +10,41 @@ class FRED:
     def __init__(self):
         self.api_key = Config.FRED_API_KEY
 
+    @RefreshCache.source("fred", skip_self=True)
     def fetch_data(self, series_ids, start_date="2000-01-01", end_date="2025-01-01", frequency="m"):
         all_data = []
 
         for series_id in series_ids:
-            url = f"{self.BASE_URL}?series_id={series_id}&api_key={self.api_key}&file_type=json&frequency={frequency}&observation_start={start_date}&observation_end={end_date}"
+            df = get_series_cache().update(
+                f"fred/{series_id}/{frequency}/{start_date}",
+                lambda start, series_id=series_id: self._fetch_series(
+                    series_id, start_date if start is None else start.strftime("%Y-%m-%d"), end_date, frequency),
+                lookback_days=Config.REVISION_LOOKBACK_DAYS["fred"],
+            )
+            if df is None:
+                continue
 
-            session = requests.Session()
-            retries = Retry(total=5, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-            session.mount("https://", HTTPAdapter(max_retries=retries))
+            all_data.append(df[df.index <= end_date])
 
-            response = session.get(url)
-            if response.status_code != 200:
-                continue
+        return pd.concat(all_data, axis=1)
+
+    def _fetch_series(self, series_id, start_date, end_date, frequency):
+        url = f"{self.BASE_URL}?series_id={series_id}&api_key={self.api_key}&file_type=json&frequency={frequency}&observation_start={start_date}&observation_end={end_date}"
 
-            data = response.json()
-            df = pd.DataFrame(data["observations"])
-            df["date"] = pd.to_datetime(df["date"])
-            df["value"] = pd.to_numeric(df["value"], errors="coerce")
+        response = transport.get(url)
+        if response.status_code != 200:
+            return None
 
-            df = df.rename(columns={"value": series_id}).set_index("date")
-            df.index.name = "Date"
+        data = response.json()
+        df = pd.DataFrame(data["observations"])
+        if df.empty:
+            return None
+        df["date"] = pd.to_datetime(df["date"])
+        df["value"] = pd.to_numeric(df["value"], errors="coerce")
 
-            df.drop(columns=["realtime_start", "realtime_end"], errors="ignore", inplace=True)
+        df = df.rename(columns={"value": series_id}).set_index("date")
+        df.index.name = "Date"
 
-            all_data.append(df)
+        df.drop(columns=["realtime_start", "realtime_end"], errors="ignore", inplace=True)
 
-        return pd.concat(all_data, axis=1)
\ No newline at end of file
+        return df
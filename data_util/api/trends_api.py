@@ -2,6 +2,7 @@ import pandas as pd
 import time
 from datetime import timedelta
 from pytrends.request import TrendReq
+from ..metrics_util import fetch_timed
 
 
 class TRENDS:
@@ -20,6 +21,7 @@ class TRENDS:
         return TRENDS._fetch_trends(start_date, end_date, keywords, gprop="youtube")
 
     @staticmethod
+    @fetch_timed("trends")
     def _fetch_trends(start_date, end_date, keywords, gprop):
         start_date = pd.to_datetime(start_date)
         end_date = pd.to_datetime(end_date)
@@ -0,0 +1,166 @@
+import functools
+import hashlib
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+from .metrics_util import SOURCE_FETCHES, fetch_timed
+
+
+class FileFingerprint:
+    """
+    Content hash of a file that is only recomputed when the file's mtime or size changes. path can also be a
+    callable returning the path, resolved on every check (e.g. a storage whose file moves to another backend).
+    """
+
+    def __init__(self, path, chunk_size=1 << 20):
+        self._path = path
+        self.chunk_size = chunk_size
+        self._stat_key = None
+        self._digest = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path() if callable(self._path) else self._path
+
+    def stat_key(self, path=None):
+        path = path or self.path
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return path, st.st_mtime_ns, st.st_size
+
+    def changed(self):
+        """Cheap check (a single stat) whether the file differs from the last hashed version."""
+        return self.stat_key() != self._stat_key
+
+    def digest(self):
+        """Returns the sha256 of the file, or None if the file does not exist."""
+        with self._lock:
+            path = self.path
+            stat_key = self.stat_key(path)
+            if stat_key is None:
+                self._stat_key, self._digest = None, None
+            elif stat_key != self._stat_key:
+                self._digest = self._hash_file(path)
+                self._stat_key = stat_key
+            return self._digest
+
+    def _hash_file(self, path):
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used mapping."""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+class RefreshCache:
+    """
+    Refresh-scoped memoization of remote source fetches.
+
+    While a refresh is active (between `begin()` and `end()`), every call of a function decorated with
+    `@RefreshCache.source(name)` with the same arguments is fetched at most once; concurrent callers wait
+    for the in-flight fetch and every consumer receives the same frame. Outside a refresh the decorated
+    functions behave as before. The scope is process-wide (not thread-local) so stages running in worker
+    threads share it.
+    """
+
+    _active = None
+
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.fetches = Counter()
+        self.avoided = Counter()
+
+    @classmethod
+    def begin(cls):
+        cls._active = cls()
+        return cls._active
+
+    @classmethod
+    def end(cls):
+        cls._active = None
+
+    @classmethod
+    def source(cls, name, skip_self=False):
+        """Decorator marking a function as a remote source fetch, memoized within a refresh (and timed)."""
+        def decorator(fn):
+            fn = fetch_timed(name)(fn)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                cache = cls._active
+                if cache is None:
+                    return fn(*args, **kwargs)
+                key_args = args[1:] if skip_self else args
+                key = (name, repr(key_args), repr(sorted(kwargs.items())))
+                return cache._fetch(name, key, lambda: fn(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def _fetch(self, name, key, fetch):
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+                self.fetches[name] += 1
+            else:
+                self.avoided[name] += 1
+                SOURCE_FETCHES.inc(source=name, outcome="shared")
+
+        if owner:
+            try:
+                future.set_result(fetch())
+            except Exception as e:
+                with self._lock:
+                    del self._futures[key]  # Let a later consumer retry a failed fetch
+                future.set_exception(e)
+        return future.result()
+
+    def summary(self):
+        fetched = sum(self.fetches.values())
+        avoided = sum(self.avoided.values())
+        details = ", ".join(f"{name}: {count}" for name, count in sorted(self.avoided.items()))
+        return f"source fetches: {fetched}, avoided: {avoided}" + (f" ({details})" if details else "")
@@ -7,3 +7,49 @@ class Config:
     FRED_API_KEY = os.getenv("FRED_API_KEY")
     BEA_API_KEY = os.getenv("BEA_API_KEY")
     BLS_API_KEY = os.getenv("BLS_API_KEY")
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "npy")
+    # Incremental refresh: only observations after the cached high-water mark minus a revision window are fetched
+    INCREMENTAL_REFRESH = os.getenv("INCREMENTAL_REFRESH", "1") == "1"
+    REVISION_LOOKBACK_DAYS = {
+        "yfinance": int(os.getenv("YFINANCE_LOOKBACK_DAYS", 3)),
+        "blockchain.info": int(os.getenv("BLOCKCHAIN_LOOKBACK_DAYS", 3)),
+        "bea": int(os.getenv("BEA_LOOKBACK_DAYS", 3 * 365)),
+        "fred": int(os.getenv("FRED_LOOKBACK_DAYS", 180)),
+    }
+    # PCA indicators keep streaming statistics between refreshes instead of refitting on the full history
+    INCREMENTAL_INDICATORS = os.getenv("INCREMENTAL_INDICATORS", "1") == "1"
+    # ...with a full refit at least this often (float drift; revisions of absorbed rows also trigger one)
+    INDICATOR_REFIT_DAYS = int(os.getenv("INDICATOR_REFIT_DAYS", 30))
+    # TFT inference dataloader (the prediction window is a single sample per group, workers only add overhead)
+    INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", 64))
+    INFERENCE_NUM_WORKERS = int(os.getenv("INFERENCE_NUM_WORKERS", 0))
+    # "auto" picks CUDA when available, otherwise CPU
+    INFERENCE_DEVICE = os.getenv("INFERENCE_DEVICE", "auto")
+    # Torch threads per worker process; unset = cores divided among WEB_CONCURRENCY workers (torch default without it)
+    TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", 0)) or None
+    TORCH_NUM_INTEROP_THREADS = int(os.getenv("TORCH_NUM_INTEROP_THREADS", 0)) or None
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+    # "auto" serves the exported int8 artifact (scripts/export_model.py) when it is valid, "checkpoint" never does
+    MODEL_ARTIFACT = os.getenv("MODEL_ARTIFACT", "auto")
+    # Data refresh: "embedded" = one web worker (holder of the scheduler lock) schedules refreshes,
+    # "external" = a separate `python scheduler.py` process does, "off" = no scheduled refreshes
+    REFRESH_SCHEDULER = os.getenv("REFRESH_SCHEDULER", "embedded")
+    REFRESH_TIMEZONE = os.getenv("REFRESH_TIMEZONE", "America/New_York")
+    # Crontab (in REFRESH_TIMEZONE) per source release; sources with the same time share one refresh
+    REFRESH_SCHEDULE = {
+        "btc": os.getenv("REFRESH_CRON_BTC", "20 20 * * *"),  # after the 00:00 UTC daily close
+        "bea": os.getenv("REFRESH_CRON_BEA", "45 8 * * 1-5"),  # BEA releases at 8:30 ET
+        "bls": os.getenv("REFRESH_CRON_BLS", "45 8 * * 1-5"),  # BLS releases at 8:30 ET
+        "fred": os.getenv("REFRESH_CRON_FRED", "30 16 * * 1-5"),  # H.15 rates after 16:15 ET
+    }
+    REFRESH_LEADER_RETRY_SECONDS = int(os.getenv("REFRESH_LEADER_RETRY_SECONDS", 300))
+    PRELOAD_MODEL = os.getenv("PRELOAD_MODEL", "1") == "1"
+    # daily_data feature columns as float32 (OHLC prices stay float64)
+    FLOAT32_FRAMES = os.getenv("FLOAT32_FRAMES", "1") == "1"
+    # Background forecast jobs: worker threads owning the model, bounded number of waiting jobs, result retention
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 1))
+    INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", 16))
+    INFERENCE_RESULT_TTL = int(os.getenv("INFERENCE_RESULT_TTL", 600))
+    # JSON responses: bodies from this size on are gzip/brotli compressed when the client accepts it
+    RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+    RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", 6))
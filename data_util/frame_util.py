@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+
+def columns_frame(columns):
+    """
+    Frame from {name: Series} on the union of the series' own (native) indices, without allocating a fixed
+    calendar range first. Later entries of the same name replace earlier ones, like column assignment does.
+    """
+    columns = {name: series for name, series in columns.items() if series is not None}
+    if not columns:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+    df = pd.concat(columns, axis=1).sort_index()
+    df.index.name = "Date"
+    return df
+
+
+def daily_extent(df):
+    """Daily date range from the first to the last row with any value (remove_fully_nan_rows on a dense frame)."""
+    valid = df.index[df.notna().any(axis=1).to_numpy()]
+    if len(valid) == 0:
+        return pd.DatetimeIndex([], name="Date")
+    return pd.date_range(valid.min(), valid.max(), freq="D", name="Date")
+
+
+def to_daily(df):
+    """Native-frequency frame reindexed onto its daily extent (NaN on days without an observation)."""
+    return df.reindex(daily_extent(df))
+
+
+def assemble_daily(frames, trim_column="Close", float32=True, float64_columns=("Close", "High", "Low", "Open")):
+    """
+    Aligns Date-indexed frames of any frequency onto one daily index in a single pass.
+
+    Equivalent to left-merging every frame into a dense daily calendar, dropping the leading/trailing rows that
+    are NaN in every column and then the rows before the first valid `trim_column`, but the final index is
+    computed up front and every float column is written once into a preallocated block. Float columns are
+    stored as float32 (except `float64_columns`) when float32 is set; other columns are reindexed like merge
+    does. Column name clashes get merge's _x/_y suffixes.
+    """
+    frames = [df for df in frames if df is not None and len(df.columns)]
+    names, sources = [], []
+    for df in frames:
+        for position, col in enumerate(df.columns):
+            if col in names:
+                names[names.index(col)] = f"{col}_x"
+                col = f"{col}_y"
+            names.append(col)
+            sources.append((df, position))
+
+    # Final extent: first valid trim_column .. last row with any value, daily
+    first, last = None, None
+    for df in frames:
+        valid = df.index[df.notna().any(axis=1).to_numpy()]
+        if len(valid):
+            last = valid.max() if last is None else max(last, valid.max())
+        if trim_column in df.columns:
+            start = df[trim_column].first_valid_index()
+            if start is not None:
+                first = start if first is None else min(first, start)
+    if first is None or last is None or last < first:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="Date"), columns=names)
+    index = pd.date_range(first.normalize(), last.normalize(), freq="D", name="Date")
+
+    float_positions = [i for i, (df, position) in enumerate(sources)
+                       if pd.api.types.is_float_dtype(df.dtypes.iloc[position])]
+    block32 = [i for i in float_positions if float32 and names[i] not in float64_columns]
+    block64 = [i for i in float_positions if i not in block32]
+
+    data = {}
+    row_positions = {}
+    for block, dtype in ((block32, np.float32), (block64, np.float64)):
+        values = np.full((len(index), len(block)), np.nan, dtype=dtype, order="F")
+        for j, i in enumerate(block):
+            df, position = sources[i]
+            if id(df) not in row_positions:
+                row_positions[id(df)] = index.get_indexer(df.index)
+            rows = row_positions[id(df)]
+            inside = rows >= 0
+            values[rows[inside], j] = df.iloc[:, position].to_numpy()[inside]
+            data[i] = values[:, j]
+
+    # Integer/object columns are reindexed as merge would (integers with gaps become float64)
+    for i, (df, position) in enumerate(sources):
+        if i not in data:
+            data[i] = df.iloc[:, position].reindex(index).to_numpy()
+
+    return pd.DataFrame({names[i]: data[i] for i in range(len(names))}, index=index, columns=names, copy=False)
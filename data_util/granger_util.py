@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+
+
+class GrangerUtil:
+    """
+    Batched Granger lag selection.
+
+    Equivalent to running `statsmodels.grangercausalitytests(merged[[feature, target]], max_lag)` per
+    feature and picking the lag with the lowest ssr_chi2test p-value, but the target is aligned once,
+    features with the same valid-row pattern share one set of lagged target matrices, the regressions of
+    all features of a group are solved as one stacked least-squares problem per lag, and groups are
+    spread over a thread pool. Threads, not a forked process pool: the stacked pinv/matmul work runs in
+    BLAS without the GIL, and the pipeline stages calling this run on threads of their own, so forking could
+    copy held locks into the children. Results are cached on disk by (feature hash, target hash, max_lag).
+    """
+
+    CACHE_PATH = os.path.join("Data", "Cache", "granger.json")
+    _cache = None
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def best_lags(df_features, df_target, target_col, max_lag=5, n_jobs=None, use_cache=True):
+        """Returns {feature column: best lag or None} for every column of df_features."""
+        target = df_target[target_col].replace([np.inf, -np.inf], np.nan)
+        features = df_features.replace([np.inf, -np.inf], np.nan)
+        common = features.index.intersection(target.index)
+        target = target.loc[common]
+        features = features.loc[common]
+
+        target_hash = GrangerUtil._hash(target)
+        cache = GrangerUtil._load_cache() if use_cache else {}
+        results, keys, pending = {}, {}, []
+        for col in features.columns:
+            key = f"{GrangerUtil._hash(features[col])}:{target_hash}:{max_lag}"
+            if key in cache:
+                results[col] = cache[key]
+            else:
+                keys[col] = key
+                pending.append(col)
+
+        # Group features by their valid-row mask so each group shares one aligned target sample
+        groups = {}
+        target_valid = target.notna().to_numpy()
+        for col in pending:
+            mask = features[col].notna().to_numpy() & target_valid
+            groups.setdefault(mask.tobytes(), (mask, []))[1].append(col)
+
+        tasks = []
+        for mask, cols in groups.values():
+            if mask.sum() < max_lag + 1:
+                results.update({col: None for col in cols})
+                continue
+            tasks.append((cols, features[cols].to_numpy(dtype=np.float64)[mask].T,
+                          target.to_numpy(dtype=np.float64)[mask], max_lag))
+
+        n_jobs = n_jobs or min(len(tasks), os.cpu_count() or 1)
+        if n_jobs > 1 and len(tasks) > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs, thread_name_prefix="granger") as executor:
+                outputs = list(executor.map(GrangerUtil._group_best_lags, tasks))
+        else:
+            outputs = [GrangerUtil._group_best_lags(task) for task in tasks]
+        for output in outputs:
+            results.update(output)
+
+        if use_cache and keys:
+            GrangerUtil._store_cache({keys[col]: results[col] for col in keys})
+        return {col: results[col] for col in features.columns}
+
+    @staticmethod
+    def _group_best_lags(task):
+        cols, Y, target, max_lag = task
+        n = Y.shape[1]
+        # statsmodels requires more than 3 * max_lag + 1 observations
+        if n <= 3 * max_lag + 1:
+            return {col: None for col in cols}
+
+        best_lag = np.full(len(cols), None, dtype=object)
+        best_p = np.ones(len(cols))
+        for lag in range(1, max_lag + 1):
+            nobs = n - lag
+            y = Y[:, lag:]
+            const = np.ones((len(cols), nobs, 1))
+            own_lags = np.stack([Y[:, lag - i:n - i] for i in range(1, lag + 1)], axis=2)
+            target_lags = np.stack([target[lag - i:n - i] for i in range(1, lag + 1)], axis=1)
+            target_lags = np.broadcast_to(target_lags, (len(cols), nobs, lag))
+
+            ssr_restricted = GrangerUtil._ssr(np.concatenate([const, own_lags], axis=2), y)
+            ssr_joint = GrangerUtil._ssr(np.concatenate([const, own_lags, target_lags], axis=2), y)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                statistic = nobs * (ssr_restricted - ssr_joint) / ssr_joint
+            p_values = chi2.sf(statistic, lag)
+            improved = np.nan_to_num(p_values, nan=1.0) < best_p
+            best_p[improved] = p_values[improved]
+            best_lag[improved] = lag
+
+        return {col: (int(lag) if lag is not None else None) for col, lag in zip(cols, best_lag)}
+
+    @staticmethod
+    def _ssr(X, y):
+        """Sum of squared OLS residuals for a stack of designs X (F, n, k) and targets y (F, n)."""
+        beta = np.linalg.pinv(X) @ y[:, :, None]
+        residuals = y - (X @ beta)[:, :, 0]
+        return np.einsum("ij,ij->i", residuals, residuals)
+
+    @staticmethod
+    def _hash(series):
+        h = hashlib.sha256()
+        h.update(pd.DatetimeIndex(series.index).as_unit("ns").asi8.tobytes())
+        h.update(series.to_numpy(dtype=np.float64).tobytes())
+        return h.hexdigest()[:32]
+
+    @staticmethod
+    def _load_cache():
+        with GrangerUtil._cache_lock:
+            if GrangerUtil._cache is None:
+                GrangerUtil._cache = {}
+                if os.path.exists(GrangerUtil.CACHE_PATH):
+                    with open(GrangerUtil.CACHE_PATH) as f:
+                        GrangerUtil._cache = json.load(f)
+            return dict(GrangerUtil._cache)
+
+    @staticmethod
+    def _store_cache(entries):
+        with GrangerUtil._cache_lock:
+            GrangerUtil._cache.update(entries)
+            os.makedirs(os.path.dirname(GrangerUtil.CACHE_PATH), exist_ok=True)
+            tmp_path = f"{GrangerUtil.CACHE_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(GrangerUtil._cache, f)
+            os.replace(tmp_path, GrangerUtil.CACHE_PATH)
@@ -1,8 +1,43 @@
+import json
+import os
 import pandas as pd
 from datetime import datetime
 import holidays
 
 class HolidayUtil:
+    # Holiday calendars per (country, year), keyed by the holidays package version so upgrades refresh them
+    CACHE_PATH = os.path.join("Data", "Cache", "Holidays", holidays.__version__)
+
+    @staticmethod
+    def _year_holidays(country_code, year):
+        """{ISO date: name} of one country/year, read from the on-disk cache or expanded once and stored."""
+        path = os.path.join(HolidayUtil.CACHE_PATH, f"{country_code}_{year}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+
+        calendar = holidays.country_holidays(country_code, years=year)
+        entries = {day.isoformat(): name for day, name in sorted(calendar.items())}
+        os.makedirs(HolidayUtil.CACHE_PATH, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+        return entries
+
+    @staticmethod
+    def holiday_names(country_code, start_year, end_year):
+        """Date -> holiday name table of a country for the given (inclusive) year range."""
+        entries = {}
+        for year in range(start_year, end_year + 1):
+            for day, name in HolidayUtil._year_holidays(country_code, year).items():
+                # Observed days can fall into a neighbouring year; merge names like holidays does
+                if day in entries and name not in entries[day]:
+                    entries[day] = f"{entries[day]}; {name}"
+                else:
+                    entries.setdefault(day, name)
+        return pd.Series(list(entries.values()), index=pd.to_datetime(list(entries.keys())), dtype=object)
+
     @staticmethod
     def generate_holiday_dataframe(start_date="2000-01-01", end_date=None, countries=None, halving_dates=None):
         if end_date is None:
@@ -25,8 +60,9 @@ class HolidayUtil:
         df_holidays.index.name = "Date"
 
         for country_name, country_code in countries.items():
-            holiday_calendar = holidays.country_holidays(country_code)
-            df_holidays[country_name] = df_holidays.index.map(lambda x: holiday_calendar.get(x, "-"))
+            names = HolidayUtil.holiday_names(country_code, date_range.min().year, date_range.max().year)
+            names = names[~names.index.duplicated(keep="first")]
+            df_holidays[country_name] = names.reindex(date_range, fill_value="-").to_numpy()
 
         df_holidays["day"] = df_holidays.index.day
         df_holidays["month"] = df_holidays.index.month
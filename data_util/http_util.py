@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics_util import HTTP_REQUESTS, HTTP_REQUEST_SECONDS, HTTP_RESPONSE_BYTES
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to `capacity`.
+
+    `acquire` blocks until enough tokens are available. `consume` takes tokens without waiting and may
+    drive the bucket negative, which is how after-the-fact costs (e.g. response bytes) are charged.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1.0):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= min(tokens, self.capacity):
+                    self._tokens -= tokens
+                    return
+                wait = (min(tokens, self.capacity) - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def consume(self, tokens):
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+
+
+class SlidingWindowLimit:
+    """
+    Thread-safe limit of at most `limit` units per any `window` seconds (the exact rule of per-minute API
+    quotas, which a token bucket's initial burst can exceed two-fold).
+
+    `acquire(cost)` blocks until the cost fits into the last window and records it; `acquire(0)` waits until
+    the window is below the limit. `consume` records a cost after the fact (e.g. response bytes, errors)
+    without waiting, so it can overshoot by the costs of requests already in flight.
+    """
+
+    def __init__(self, limit, window=60.0):
+        self.limit = float(limit)
+        self.window = float(window)
+        self._events = deque()
+        self._used = 0.0
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._events and self._events[0][0] <= now - self.window:
+            self._used -= self._events.popleft()[1]
+
+    def acquire(self, cost=1.0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                if self._used + cost <= self.limit and (cost > 0 or self._used < self.limit):
+                    if cost:
+                        self._events.append((now, cost))
+                        self._used += cost
+                    return
+                wait = self._events[0][0] + self.window - now if self._events else 0.0
+            time.sleep(max(wait, 0.01))
+
+    def consume(self, cost):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._events.append((now, cost))
+            self._used += cost
+
+
+def _same_option(current, value):
+    """Equal options; Retry objects (no __eq__) are compared by their settings."""
+    if current is value:
+        return True
+    if isinstance(current, Retry) and isinstance(value, Retry):
+        return vars(current) == vars(value)
+    return current == value
+
+
+class Transport:
+    """
+    Shared HTTP layer for the data_util.api clients.
+
+    One pooled keep-alive session per host (so TLS handshakes are reused across series and threads),
+    retries with exponential backoff, a default timeout on every call, optional per-host rate limits and
+    an optional conditional-request cache (ETag / Last-Modified) on disk. Per-host request, error,
+    latency and byte counters are kept for the refresh log.
+    """
+
+    def __init__(self, retries=5, backoff_factor=1, timeout=(10, 60), pool_maxsize=10,
+                 cache_dir="Data/Cache/HTTP"):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.cache_dir = cache_dir
+        self._hosts = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"requests": 0, "errors": 0, "not_modified": 0, "bytes": 0, "seconds": 0.0})
+
+    def configure(self, host, retry=None, pool_maxsize=None, rate_limit=None, session_factory=None, timeout=None):
+        """
+        Per-host overrides: urllib3 Retry, pool size, TokenBucket, session factory (e.g. cloudscraper).
+        Clients call this on every fetch; the host's session is only rebuilt when an option it is built
+        from (retry, pool size, factory) actually changed, and the replaced session is closed.
+        """
+        with self._lock:
+            options = self._hosts.setdefault(host, {})
+            rebuild = False
+            for key, value in (("retry", retry), ("pool_maxsize", pool_maxsize), ("rate_limit", rate_limit),
+                               ("session_factory", session_factory), ("timeout", timeout)):
+                if value is None:
+                    continue
+                if key in ("retry", "pool_maxsize", "session_factory") and not _same_option(options.get(key), value):
+                    rebuild = True
+                options[key] = value
+            session = self._sessions.pop(host, None) if rebuild else None
+        if session is not None:
+            session.close()  # Rebuilt with the new options on next use
+
+    def session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                options = self._hosts.get(host, {})
+                factory = options.get("session_factory")
+                session = factory() if factory is not None else requests.Session()
+                # Only idempotent verbs are retried (a POST may have been processed before the error)
+                retry = options.get("retry") or Retry(total=self.retries, backoff_factor=self.backoff_factor,
+                                                      status_forcelist=[429, 500, 502, 503, 504],
+                                                      allowed_methods=Retry.DEFAULT_ALLOWED_METHODS)
+                pool_maxsize = options.get("pool_maxsize", self.pool_maxsize)
+                if factory is None:
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                else:
+                    # Keep the factory's own adapters (e.g. cloudscraper's TLS cipher suite), only resize
+                    # their pools and set the retry policy
+                    for adapter in set(session.adapters.values()):
+                        self._configure_adapter(adapter, pool_maxsize, retry)
+                self._sessions[host] = session
+            return session
+
+    @staticmethod
+    def _configure_adapter(adapter, pool_maxsize, retry):
+        adapter.max_retries = retry
+        if isinstance(adapter, HTTPAdapter):
+            adapter._pool_connections, adapter._pool_maxsize = 1, pool_maxsize
+            # Subclasses add their own pool arguments (ssl_context) in init_poolmanager
+            adapter.init_poolmanager(1, pool_maxsize, block=adapter._pool_block)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method, url, cache=False, **kwargs):
+        """
+        Sends a request through the host's pooled session. With cache=True (GET only) the last response
+        is stored on disk and revalidated with If-None-Match / If-Modified-Since; a 304 returns the
+        stored body as a regular 200 response.
+        """
+        host = urlsplit(url).netloc
+        options = self._hosts.get(host, {})
+        kwargs.setdefault("timeout", options.get("timeout", self.timeout))
+
+        cached = self._cache_load(url) if cache and method == "GET" else None
+        if cached is not None:
+            headers = dict(kwargs.pop("headers", None) or {})
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+            kwargs["headers"] = headers
+
+        rate_limit = options.get("rate_limit")
+        if rate_limit is not None:
+            rate_limit.acquire()
+
+        start = time.perf_counter()
+        try:
+            response = self.session(host).request(method, url, **kwargs)
+        except requests.RequestException:
+            self._record(host, time.perf_counter() - start, 0, error=True, status="error")
+            raise
+        self._record(host, time.perf_counter() - start, len(response.content),
+                     error=response.status_code >= 400, not_modified=response.status_code == 304,
+                     status=f"{response.status_code // 100}xx")
+
+        if cached is not None and response.status_code == 304:
+            return self._cached_response(url, cached)
+        if cache and method == "GET" and response.status_code == 200:
+            self._cache_store(url, response)
+        return response
+
+    def _record(self, host, seconds, size, error=False, not_modified=False, status=None):
+        HTTP_REQUEST_SECONDS.observe(seconds, host=host)
+        HTTP_REQUESTS.inc(host=host, status=status)
+        HTTP_RESPONSE_BYTES.inc(size, host=host)
+        with self._lock:
+            stats = self._stats[host]
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["not_modified"] += int(not_modified)
+            stats["bytes"] += size
+            stats["seconds"] += seconds
+
+    def stats(self):
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+    def summary(self):
+        parts = []
+        for host, stats in sorted(self.stats().items()):
+            parts.append(f"{host}: {stats['requests']} req, {stats['bytes'] / 2 ** 20:.1f} MB, "
+                         f"{stats['seconds']:.1f}s")
+        return "; ".join(parts)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _cache_path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest())
+
+    def _cache_load(self, url):
+        path = self._cache_path(url)
+        if not os.path.exists(f"{path}.json"):
+            return None
+        with open(f"{path}.json") as f:
+            return json.load(f)
+
+    def _cache_store(self, url, response):
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(url)
+        with open(f"{path}.body", "wb") as f:
+            f.write(response.content)
+        with open(f"{path}.json", "w") as f:
+            json.dump({"etag": etag, "last_modified": last_modified,
+                       "content_type": response.headers.get("Content-Type"), "encoding": response.encoding}, f)
+
+    def _cached_response(self, url, cached):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = cached.get("encoding")
+        if cached.get("content_type"):
+            response.headers["Content-Type"] = cached["content_type"]
+        with open(f"{self._cache_path(url)}.body", "rb") as f:
+            response._content = f.read()
+        return response
+
+
+transport = Transport()
@@ -0,0 +1,152 @@
+import gzip
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+
+from .cache_util import LRUCache
+from .config import Config
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered without it
+    brotli = None
+
+
+def dumps(obj):
+    """
+    JSON bytes of obj. numpy arrays and scalars are serialized directly and NaN becomes null; with orjson
+    installed no intermediate Python lists are built.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f":
+            return np.where(np.isnan(value), None, value.astype(object)).tolist()
+        return value.tolist()
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(pd.Timestamp(value).date())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def epoch_days(dates):
+    """int64 days since 1970-01-01 of datetime-like values."""
+    return pd.DatetimeIndex(dates).values.astype("datetime64[D]").astype(np.int64)
+
+
+def columnar(df, columns=None, dates=None):
+    """
+    Columnar block of a frame: {"start": "YYYY-MM-DD", "days": [offsets from start], column: [values], ...}.
+    Dates come from `dates` (a column name or values) or the index; values stay numpy arrays for dumps().
+    """
+    if dates is None:
+        dates = df.index
+    elif isinstance(dates, str):
+        dates = df[dates]
+    days = epoch_days(dates)
+    return {
+        "start": str(np.datetime64(int(days[0]), "D")) if len(days) else None,
+        "days": days - days[0] if len(days) else days,
+        **{col: df[col].to_numpy(dtype=np.float64) for col in (columns or [])},
+    }
+
+
+def lttb(x, y, n):
+    """
+    Indices of the n points kept by Largest-Triangle-Three-Buckets downsampling of (x, y), first and last point
+    included. Returns all indices when there are not more than n points.
+    """
+    count = len(x)
+    if n >= count or n < 3:
+        return np.arange(count) if n >= count else np.linspace(0, count - 1, max(n, 0)).astype(np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket edges over the inner points; the first and last points are their own buckets
+    edges = np.linspace(1, count - 1, n - 1).astype(np.int64)
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for i in range(n - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else count
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def content_etag(*parts):
+    """Strong ETag (quoted) of bytes or of a key made of several parts."""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+        h.update(b"\0")
+    return f'"{h.hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ResponseEncoder:
+    """
+    Content-Encoding negotiation for JSON bodies (br when brotli is installed, else gzip). Compressed bodies are
+    kept in an LRU keyed by ETag, so repeated requests for the same payload are compressed once.
+    """
+
+    def __init__(self, min_bytes=None, gzip_level=None, brotli_quality=5, max_entries=64):
+        self.min_bytes = Config.RESPONSE_COMPRESSION_MIN_BYTES if min_bytes is None else min_bytes
+        self.gzip_level = gzip_level or Config.RESPONSE_GZIP_LEVEL
+        self.brotli_quality = brotli_quality
+        self._compressed = LRUCache(max_entries=max_entries)
+
+    def negotiate(self, accept_encoding):
+        accepted = {}
+        for item in (accept_encoding or "").split(","):
+            name, _, params = item.strip().partition(";")
+            q = params.strip()[2:] if params.strip().startswith("q=") else "1"
+            try:
+                accepted[name.strip().lower()] = float(q)
+            except ValueError:
+                continue
+        if brotli is not None and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def encode(self, body, etag, accept_encoding):
+        """Returns (body, encoding); encoding is None when the body is sent as is."""
+        encoding = self.negotiate(accept_encoding) if len(body) >= self.min_bytes else None
+        if encoding is None:
+            return body, None
+        key = (etag, encoding)
+        compressed = self._compressed.get(key)
+        if compressed is None:
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            self._compressed.put(key, compressed)
+        return compressed, encoding
+
+    def stats(self):
+        return {"compressed_hits": self._compressed.hits, "compressed_misses": self._compressed.misses}
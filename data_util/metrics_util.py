@@ -0,0 +1,249 @@
+"""
+In-process instrumentation: counters and histograms with labels, rendered in the Prometheus text format.
+
+Hot paths record into module-level metrics (`timed` for functions, `Histogram.time` for blocks); component stats
+that already exist (caches, model registry, job queue) are exported at scrape time through `register_stats`.
+Values are per process: with several web workers each scrape reports the worker that answered it.
+"""
+import functools
+import math
+import re
+import threading
+import time
+
+import pandas as pd
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format(bound)}, cumulative))
+                samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, state["count"]))
+                samples.append((f"{self.name}_sum", labels, state["sum"]))
+                samples.append((f"{self.name}_count", labels, state["count"]))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        self.histogram.observe(self.seconds, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def register_stats(self, prefix, fn):
+        """Exports the numeric leaves of the (nested) dict fn() returns as gauges named prefix_key_subkey."""
+        with self._lock:
+            self._collectors[prefix] = fn
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(_line(name, labels, value) for name, labels, value in samples)
+        for prefix, fn in collectors:
+            try:
+                stats = fn()
+            except Exception as e:
+                print(f"Metrics: stats of {prefix} unavailable: {e}")
+                continue
+            for name, value in _flatten(prefix, stats):
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(_line(name, {}, value))
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(prefix, value):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', str(key))}", item)
+    elif isinstance(value, (bool, int, float)):
+        yield prefix, float(value)
+
+
+def _format(value):
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else f"{value:.1f}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _line(name, labels, value):
+    if labels:
+        pairs = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        return f"{name}{{{pairs}}} {_format(value)}"
+    return f"{name} {_format(value)}"
+
+
+REGISTRY = Registry()
+
+# Data refresh
+SOURCE_FETCH_SECONDS = REGISTRY.histogram("btcpred_source_fetch_seconds", "Remote source fetch duration.", ["source"])
+SOURCE_FETCHES = REGISTRY.counter("btcpred_source_fetches_total", "Remote source fetches by outcome.",
+                                  ["source", "outcome"])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("btcpred_http_request_seconds", "Outbound HTTP request duration.", ["host"])
+HTTP_REQUESTS = REGISTRY.counter("btcpred_http_requests_total", "Outbound HTTP requests by status class.",
+                                 ["host", "status"])
+HTTP_RESPONSE_BYTES = REGISTRY.counter("btcpred_http_response_bytes_total", "Outbound HTTP response bytes.", ["host"])
+STAGE_SECONDS = REGISTRY.histogram("btcpred_stage_seconds", "Processing stage duration.", ["stage"])
+STAGE_ROWS = REGISTRY.counter("btcpred_stage_rows_total", "Rows produced by processing stages.", ["stage"])
+STAGE_BYTES = REGISTRY.counter("btcpred_stage_bytes_total", "Bytes of the frames produced by processing stages.",
+                               ["stage"])
+REFRESH_STAGE_SECONDS = REGISTRY.histogram("btcpred_refresh_stage_seconds", "Refresh pipeline stage duration.",
+                                           ["stage"])
+REFRESH_SECONDS = REGISTRY.histogram("btcpred_refresh_seconds", "Full data refresh duration.", ["status"])
+# Inference
+MODEL_LOAD_SECONDS = REGISTRY.histogram("btcpred_model_load_seconds", "Model checkpoint load duration.")
+PREDICTION_SECONDS = REGISTRY.histogram("btcpred_prediction_seconds", "TFT prediction duration by phase.",
+                                        ["phase"])
+FORECAST_JOB_SECONDS = REGISTRY.histogram("btcpred_forecast_job_seconds", "Forecast job duration by status.",
+                                          ["status"])
+FORECAST_JOB_WAIT_SECONDS = REGISTRY.histogram("btcpred_forecast_job_wait_seconds", "Forecast job queueing time.")
+# Web
+REQUEST_SECONDS = REGISTRY.histogram("btcpred_request_seconds", "HTTP request handling duration.",
+                                     ["endpoint", "status"])
+
+
+def frame_size(result):
+    """(rows, bytes) of a frame or of the frames in a tuple/list returned by a stage."""
+    frames = result if isinstance(result, (tuple, list)) else (result,)
+    rows = size = 0
+    for df in frames:
+        if isinstance(df, (pd.DataFrame, pd.Series)):
+            rows += len(df)
+            size += int(df.memory_usage(index=True).sum()) if isinstance(df, pd.DataFrame) else df.nbytes
+    return rows, size
+
+
+def fetch_timed(source):
+    """Decorator recording the duration and outcome of a remote source fetch."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                SOURCE_FETCHES.inc(source=source, outcome="error")
+                raise
+            finally:
+                SOURCE_FETCH_SECONDS.observe(time.perf_counter() - start, source=source)
+            SOURCE_FETCHES.inc(source=source, outcome="ok")
+            return result
+        return wrapper
+    return decorator
+
+
+def timed(stage):
+    """Decorator recording the duration and the rows/bytes of the result of a processing stage."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                result = fn(*args, **kwargs)
+            rows, size = frame_size(result)
+            STAGE_ROWS.inc(rows, stage=stage)
+            STAGE_BYTES.inc(size, stage=stage)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+
+from .metrics_util import REFRESH_STAGE_SECONDS
+from .storage_util import get_storage
+
+
+class Stage:
+    def __init__(self, name, fn, inputs=(), outputs=None, checkpoint=True):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs) if outputs is not None else (name,)
+        self.checkpoint = checkpoint
+
+
+class Pipeline:
+    """
+    Stage DAG of the data refresh.
+
+    Every stage declares the outputs it consumes (`inputs`, passed as keyword arguments) and the outputs it
+    produces (`outputs`; a stage with several outputs returns a tuple). Stages whose inputs are ready run
+    concurrently on a thread pool. Outputs of checkpointed stages are written through the storage backend
+    under `checkpoint_dir` as soon as the stage finishes; when a run fails, the next run on the same day loads
+    the finished stages from there instead of executing them again. A successful run removes its checkpoints.
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, checkpoint_dir="Data/Cache/Stages", max_workers=4, backend=None):
+        self.stages = {}
+        self.checkpoint_dir = checkpoint_dir
+        self.max_workers = max_workers
+        self.backend = backend
+        self.timings = {}
+        self.resumed = []
+        self._lock = threading.Lock()
+
+    def add(self, name, fn, inputs=(), outputs=None, checkpoint=True):
+        self.stages[name] = Stage(name, fn, inputs, outputs, checkpoint)
+        return self
+
+    def stage(self, name, inputs=(), outputs=None, checkpoint=True):
+        """Decorator form of add()."""
+        def decorator(fn):
+            self.add(name, fn, inputs, outputs, checkpoint)
+            return fn
+        return decorator
+
+    def _producers(self):
+        producers = {}
+        for stage in self.stages.values():
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"Output '{output}' is produced by both '{producers[output]}' and '{stage.name}'.")
+                producers[output] = stage.name
+        for stage in self.stages.values():
+            missing = [name for name in stage.inputs if name not in producers]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' needs outputs nobody produces: {missing}")
+        return producers
+
+    def run(self, resume=True):
+        """Runs all stages; returns {output name: value}. The first stage error is raised after running stages end."""
+        producers = self._producers()
+        storage = get_storage(self.checkpoint_dir, self.backend)
+        manifest = self._load_manifest() if resume else {}
+        results, done = {}, set()
+        self.timings, self.resumed = {}, []
+
+        for name, stage in self.stages.items():
+            if stage.checkpoint and name in manifest:
+                try:
+                    values = {output: storage.read(output) for output in stage.outputs}
+                except Exception as e:
+                    print(f"Checkpoint of stage {name} unreadable ({e}), running it again.")
+                    continue
+                results.update(values)
+                done.add(name)
+                self.resumed.append(name)
+                self.timings[name] = 0.0
+        if self.resumed:
+            print(f"Resuming refresh: stages {', '.join(self.resumed)} loaded from checkpoints.")
+
+        pending = {name: stage for name, stage in self.stages.items() if name not in done}
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                if error is None:
+                    for name, stage in list(pending.items()):
+                        if all(producers[output] in done for output in stage.inputs):
+                            kwargs = {output: results[output] for output in stage.inputs}
+                            running[executor.submit(self._run_stage, stage, kwargs)] = name
+                            del pending[name]
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        values = future.result()
+                    except Exception as e:
+                        error = error or e
+                        continue
+                    results.update(values)
+                    done.add(name)
+                    if self.stages[name].checkpoint:
+                        self._save_checkpoint(storage, name, values, manifest)
+
+        if error is not None:
+            raise error
+        self.clear_checkpoints()
+        return results
+
+    def _run_stage(self, stage, kwargs):
+        start = time.perf_counter()
+        try:
+            value = stage.fn(**kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            REFRESH_STAGE_SECONDS.observe(seconds, stage=stage.name)
+            with self._lock:
+                self.timings[stage.name] = seconds
+        values = value if len(stage.outputs) > 1 else (value,)
+        return dict(zip(stage.outputs, values))
+
+    def _save_checkpoint(self, storage, name, values, manifest):
+        for output, df in values.items():
+            storage.write(output, df.rename_axis("Date"))
+        manifest[name] = {"seconds": self.timings.get(name)}
+        manifest["_date"] = date.today().isoformat()
+        path = os.path.join(self.checkpoint_dir, self.MANIFEST)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def _load_manifest(self):
+        path = os.path.join(self.checkpoint_dir, self.MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            manifest = json.load(f)
+        # Checkpoints from an earlier day are stale: the sources have published since
+        if manifest.get("_date") != date.today().isoformat():
+            self.clear_checkpoints()
+            return {}
+        return manifest
+
+    def clear_checkpoints(self):
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+    def timings_summary(self):
+        """'stage=1.23s;...' in stage order; resumed stages are marked as such."""
+        return ";".join(f"{name}={'resumed' if name in self.resumed else f'{self.timings[name]:.2f}s'}"
+                        for name in self.stages if name in self.timings)
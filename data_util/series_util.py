@@ -0,0 +1,94 @@
+import threading
+import pandas as pd
+
+from .config import Config
+from .storage_util import get_storage
+
+
+class SeriesCache:
+    """
+    Local per-source time-series cache with a high-water mark (last cached date) per series.
+
+    `update` asks the source only for observations after the high-water mark minus a revision look-back
+    window, merges them into the cached history (new observations win) and persists the result, so a
+    daily refresh downloads days instead of the full history.
+    """
+
+    COLUMN_SEP = "||"
+
+    def __init__(self, root="Data/Cache/Sources", enabled=None, backend=None):
+        self.storage = get_storage(root, backend)
+        self.enabled = Config.INCREMENTAL_REFRESH if enabled is None else enabled
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _name(key):
+        return key.replace("/", "_")
+
+    def load(self, key):
+        name = self._name(key)
+        if not self.storage.exists(name):
+            return None
+        df = self.storage.read(name)
+        if len(df.columns) and all(self.COLUMN_SEP in str(col) for col in df.columns):
+            df.columns = pd.MultiIndex.from_tuples([tuple(col.split(self.COLUMN_SEP)) for col in df.columns])
+        return df
+
+    def save(self, key, df):
+        df = df.copy()
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = [self.COLUMN_SEP.join(map(str, col)) for col in df.columns]
+        self.storage.write(self._name(key), df)
+
+    def high_water_mark(self, key):
+        df = self.load(key)
+        return None if df is None or df.empty else df.index.max()
+
+    def update(self, key, fetch, lookback_days=0):
+        """
+        fetch(start) must return the observations from `start` on (start=None means full history).
+        Returns the merged full history. Falls back to the cached history if the delta fetch fails.
+        """
+        if not self.enabled:
+            return fetch(None)
+
+        with self._key_lock(key):
+            cached = self.load(key)
+            if cached is None or cached.empty:
+                df = fetch(None)
+                if df is not None and not df.empty:
+                    self.save(key, df)
+                return df
+
+            start = cached.index.max() - pd.Timedelta(days=lookback_days)
+            try:
+                new = fetch(start)
+            except Exception as e:
+                print(f"Warning: delta fetch for {key} failed ({e}), using cached history.")
+                return cached
+
+            if new is None or new.empty:
+                return cached
+
+            merged = new.combine_first(cached).sort_index()
+            merged = merged[cached.columns.union(new.columns, sort=False)]
+            merged.index.name = cached.index.name
+            self.save(key, merged)
+            print(f"{key}: {len(new)} new/revised rows since {start.date()}.")
+            return merged
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+
+_default_cache = None
+
+
+def get_series_cache():
+    """Process-wide SeriesCache used by the data_util.api clients."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SeriesCache()
+    return _default_cache
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+
+from .config import Config
+
+
+class CsvStorage:
+    """Plain CSV files (the original format). No projection pushdown beyond `usecols`, no memory mapping."""
+
+    extension = ".csv"
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, name):
+        """Path of the file that changes whenever the frame is rewritten (used for mtime/hash checks)."""
+        return os.path.join(self.root, f"{name}{self.extension}")
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def mtime(self, name):
+        return os.path.getmtime(self.path(name))
+
+    def columns(self, name):
+        return list(pd.read_csv(self.path(name), index_col="Date", nrows=0).columns)
+
+    def write(self, name, df):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        tmp_path = f"{self.path(name)}.{uuid.uuid4().hex}.tmp"
+        df.to_csv(tmp_path, index=True)
+        os.replace(tmp_path, self.path(name))
+
+    def read(self, name, columns=None, mmap=False):
+        usecols = None if columns is None else ["Date"] + list(columns)
+        return pd.read_csv(self.path(name), index_col="Date", parse_dates=True, usecols=usecols)
+
+
+class NpyStorage:
+    """
+    One directory per frame with a typed .npy file per column plus the datetime index.
+
+    Columns are read individually (projection) and can be memory-mapped, so several worker processes
+    reading the same frame share the page cache instead of each holding a parsed copy. String columns
+    are stored as fixed-width unicode so they stay mappable; missing strings round-trip as NaN, the
+    same as with CSV. `meta.json` is written last and carries a content digest, so its mtime/hash
+    identifies the version of the frame.
+    """
+
+    extension = ".npy.d"
+    META = "meta.json"
+
+    def __init__(self, root):
+        self.root = root
+
+    def _dir(self, name):
+        return os.path.join(self.root, f"{name}{self.extension}")
+
+    def path(self, name):
+        return os.path.join(self._dir(name), self.META)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def mtime(self, name):
+        return os.path.getmtime(self.path(name))
+
+    def _meta(self, name):
+        with open(self.path(name)) as f:
+            return json.load(f)
+
+    def columns(self, name):
+        return [column["name"] for column in self._meta(name)["columns"]]
+
+    def write(self, name, df):
+        target = self._dir(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_dir = f"{target}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_dir)
+
+        digest = hashlib.sha256()
+        index = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+        np.save(os.path.join(tmp_dir, "index.npy"), index)
+        digest.update(index.tobytes())
+
+        columns = []
+        for i, col in enumerate(df.columns):
+            values, kind = self._to_array(df.iloc[:, i])
+            file_name = f"c{i:04d}.npy"
+            np.save(os.path.join(tmp_dir, file_name), values)
+            digest.update(str(col).encode())
+            digest.update(values.tobytes())
+            columns.append({"name": col, "file": file_name, "kind": kind})
+
+        meta = {"index_name": df.index.name, "rows": len(df), "columns": columns, "digest": digest.hexdigest()}
+        with open(os.path.join(tmp_dir, self.META), "w") as f:
+            json.dump(meta, f)
+
+        # Swap directories; readers holding memory maps of the old files keep valid (unlinked) pages.
+        old_dir = f"{target}.{uuid.uuid4().hex}.old"
+        if os.path.exists(target):
+            os.replace(target, old_dir)
+        os.replace(tmp_dir, target)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @staticmethod
+    def _to_array(series):
+        if pd.api.types.is_bool_dtype(series.dtype):
+            return series.to_numpy(dtype=bool), "bool"
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            return series.to_numpy(), "numeric"
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return pd.DatetimeIndex(series).as_unit("ns").asi8, "datetime"
+        return series.astype(object).where(series.notna(), "").astype(str).to_numpy(dtype=str), "str"
+
+    def read(self, name, columns=None, mmap=False):
+        meta = self._meta(name)
+        directory = self._dir(name)
+        mmap_mode = "r" if mmap else None
+
+        selected = meta["columns"]
+        if columns is not None:
+            by_name = {column["name"]: column for column in selected}
+            missing = [col for col in columns if col not in by_name]
+            if missing:
+                raise KeyError(f"Columns not found in {name}: {missing}")
+            selected = [by_name[col] for col in columns]
+
+        index = pd.DatetimeIndex(np.load(os.path.join(directory, "index.npy")).view("datetime64[ns]"),
+                                 name=meta["index_name"])
+        data = {}
+        for column in selected:
+            values = np.load(os.path.join(directory, column["file"]), mmap_mode=mmap_mode)
+            if column["kind"] == "str":
+                values = pd.Series(values, index=index).replace("", np.nan)
+            elif column["kind"] == "datetime":
+                values = np.asarray(values).view("datetime64[ns]")
+            data[column["name"]] = values
+
+        # copy=False keeps memory-mapped columns as separate, unconsolidated blocks
+        return pd.DataFrame(data, index=index, columns=[column["name"] for column in selected], copy=False)
+
+
+class ParquetStorage:
+    """Parquet files through pyarrow (optional dependency). Projection is pushed down to the reader."""
+
+    extension = ".parquet"
+
+    def __init__(self, root):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("The parquet storage backend requires pyarrow (pip install pyarrow).") from e
+        self.root = root
+
+    def path(self, name):
+        return os.path.join(self.root, f"{name}{self.extension}")
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def mtime(self, name):
+        return os.path.getmtime(self.path(name))
+
+    def columns(self, name):
+        import pyarrow.parquet as pq
+        return [col for col in pq.read_schema(self.path(name)).names if col != "Date"]
+
+    def write(self, name, df):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        tmp_path = f"{self.path(name)}.{uuid.uuid4().hex}.tmp"
+        df.to_parquet(tmp_path, index=True)
+        os.replace(tmp_path, self.path(name))
+
+    def read(self, name, columns=None, mmap=False):
+        return pd.read_parquet(self.path(name), columns=columns, memory_map=mmap)
+
+
+class CsvFallbackStorage:
+    """
+    A non-CSV backend that reads frames it does not have (yet) from their CSV files, so a deployment switched to
+    another backend keeps working before `migrate_csv` ran. Writes always go to the backend, which then takes over.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.csv = CsvStorage(storage.root)
+        self.root = storage.root
+        self.extension = storage.extension
+
+    def _source(self, name):
+        return self.csv if not self.storage.exists(name) and self.csv.exists(name) else self.storage
+
+    def path(self, name):
+        return self._source(name).path(name)
+
+    def exists(self, name):
+        return self.storage.exists(name) or self.csv.exists(name)
+
+    def mtime(self, name):
+        return self._source(name).mtime(name)
+
+    def columns(self, name):
+        return self._source(name).columns(name)
+
+    def write(self, name, df):
+        self.storage.write(name, df)
+
+    def read(self, name, columns=None, mmap=False):
+        return self._source(name).read(name, columns=columns, mmap=mmap)
+
+
+STORAGE_BACKENDS = {"csv": CsvStorage, "npy": NpyStorage, "parquet": ParquetStorage}
+
+
+def get_storage(root="Data", backend=None, csv_fallback=True):
+    """
+    Returns the configured storage backend (Config.STORAGE_BACKEND, default "npy") rooted at `root`.
+    Frames missing in a non-CSV backend are read from their CSV files unless csv_fallback is False.
+    """
+    backend = backend or Config.STORAGE_BACKEND
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}'. Choose one of {list(STORAGE_BACKENDS)}.")
+    storage = STORAGE_BACKENDS[backend](root)
+    return CsvFallbackStorage(storage) if csv_fallback and backend != "csv" else storage
+
+
+def migrate_csv(root="Data", backend=None, names=None, delete_csv=False):
+    """
+    One-off conversion of the CSV frames under `root` (daily_data and Subsets/*) to another backend.
+    Returns the list of migrated frame names.
+    """
+    source = CsvStorage(root)
+    target = get_storage(root, backend, csv_fallback=False)
+    if isinstance(target, CsvStorage):
+        return []
+
+    if names is None:
+        names = []
+        for dir_path, _, file_names in os.walk(root):
+            for file_name in sorted(file_names):
+                if file_name.endswith(".csv") and file_name != "data_fetching_log.csv":
+                    rel_path = os.path.relpath(os.path.join(dir_path, file_name), root)
+                    names.append(rel_path[:-len(".csv")].replace(os.sep, "/"))
+        names = [name for name in names if _has_date_index(source, name)]
+
+    for name in names:
+        target.write(name, source.read(name))
+        print(f"Migrated {name} -> {target.path(name)}")
+        if delete_csv:
+            os.remove(source.path(name))
+    return names
+
+
+def _has_date_index(storage, name):
+    with open(storage.path(name)) as f:
+        header = f.readline()
+    return header.split(",")[0].strip() == "Date"
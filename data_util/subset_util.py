@@ -0,0 +1,184 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+
+class SubsetStore:
+    """
+    In-memory, columnar copy of the Data/Subsets frames.
+
+    All subsets are aligned on one shared date index and kept as column-major float arrays with a
+    precomputed non-NaN mask per metric. The files are re-read only when `get_data()` publishes a new
+    version (see `publish`), so metric listing and chart extraction never touch the files.
+
+    For zoomed-out charts every subset also has weekly and monthly min/max/mean aggregates (a pyramid over
+    the daily level), written next to the subsets at publish time; `window` answers a date range from the
+    finest level that fits into the requested number of points.
+    """
+
+    CATEGORIES = ["btc", "btc-etf", "bea", "fred", "indicators"]
+    VERSION_FILE = "VERSION"
+    PYRAMID_DIR = "Pyramid"
+    # Aggregation levels above "day" as pandas period frequencies (weeks start on Monday)
+    LEVELS = {"week": "W-SUN", "month": "M"}
+    STATS = ["min", "max", "mean"]
+
+    def __init__(self, storage, subset_dir="Subsets", categories=None):
+        self.storage = storage
+        self.subset_dir = subset_dir
+        self.categories = categories or self.CATEGORIES
+        self._lock = threading.Lock()
+        self._version = None
+        self._subsets = {}
+
+    def publish(self):
+        """
+        Marks the subsets written by get_data() as a new version. Called after all files are written; builds
+        the aggregate pyramids first, so readers of the new version always find them.
+        """
+        for category in self.categories:
+            if self.storage.exists(self._name(category)):
+                for level, aggregates in self._aggregate(self._read(category)).items():
+                    for stat, df in aggregates.items():
+                        self.storage.write(self._pyramid_name(category, level, stat), df)
+
+        version_file = os.path.join(self.storage.root, self.subset_dir, self.VERSION_FILE)
+        tmp_path = f"{version_file}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(pd.Timestamp.now().isoformat())
+        os.replace(tmp_path, version_file)
+
+    def metrics(self, category):
+        """Returns the list of metrics of a category, or None if the category does not exist."""
+        subset = self._get_subsets().get(category)
+        return subset["metrics"] if subset is not None else None
+
+    def series(self, category, metric):
+        """
+        Returns (days, values) for the non-NaN observations of a metric, days as int64 days since 1970-01-01.
+        Raises KeyError if the category or metric does not exist.
+        """
+        subset = self._get_subsets()[category]
+        col = subset["positions"][metric]
+        mask = subset["mask"][:, col]
+        return subset["days"][mask], subset["values"][:, col][mask]
+
+    def window(self, category, metric, start=None, end=None, max_points=None):
+        """
+        Observations of a metric with start <= date <= end (epoch days, None = unbounded) at the finest level
+        ("day", "week", "month") with at most max_points of them; the coarsest level if none fits.
+        Returns (level, days, mean, min, max), days of aggregates being the first day of the week/month;
+        at the day level min and max are the values themselves. Raises KeyError like `series`.
+        """
+        subset = self._get_subsets()[category]
+        col = subset["positions"][metric]
+        for level, data in subset["levels"].items():
+            days = data["days"]
+            # Aggregates: from the last bucket starting on or before start (the one containing it)
+            if start is None:
+                lo = 0
+            elif level == "day":
+                lo = np.searchsorted(days, start, "left")
+            else:
+                lo = max(np.searchsorted(days, start, "right") - 1, 0)
+            hi = len(days) if end is None else np.searchsorted(days, end, "right")
+            mask = data["mask"][lo:hi, col]
+            if max_points is None or mask.sum() <= max_points or level == list(subset["levels"])[-1]:
+                break
+        rows = slice(lo, hi)
+        return (level, days[rows][mask], data["mean"][rows, col][mask], data["min"][rows, col][mask],
+                data["max"][rows, col][mask])
+
+    def version(self):
+        return self._version
+
+    def _get_subsets(self):
+        version = self._current_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._load(version)
+        return self._subsets
+
+    def _current_version(self):
+        version_file = os.path.join(self.storage.root, self.subset_dir, self.VERSION_FILE)
+        try:
+            with open(version_file) as f:
+                return f.read()
+        except FileNotFoundError:
+            # Subsets written before versioning was introduced: fall back to file mtimes
+            mtimes = [self.storage.mtime(self._name(category)) for category in self.categories
+                      if self.storage.exists(self._name(category))]
+            return str(max(mtimes)) if mtimes else None
+
+    def _name(self, category):
+        return f"{self.subset_dir}/{category}"
+
+    def _pyramid_name(self, category, level, stat):
+        return f"{self.subset_dir}/{self.PYRAMID_DIR}/{category}.{level}.{stat}"
+
+    def _read(self, category):
+        df = self.storage.read(self._name(category), mmap=True)
+        return df[~df.index.duplicated(keep="first")].apply(pd.to_numeric, errors="coerce")
+
+    def _aggregate(self, df):
+        """{level: {stat: frame}} of a daily subset; one row per week/month, indexed by its first day."""
+        aggregates = {}
+        for level, freq in self.LEVELS.items():
+            periods = df.index.to_period(freq)
+            grouped = df.groupby(periods).agg(self.STATS)
+            index = pd.DatetimeIndex(grouped.index.start_time, name="Date")
+            aggregates[level] = {stat: grouped.xs(stat, axis=1, level=1).set_axis(index) for stat in self.STATS}
+        return aggregates
+
+    def _load_levels(self, category, df):
+        """Aggregate pyramid of a subset from its published files, computed here for subsets published without."""
+        names = {(level, stat): self._pyramid_name(category, level, stat)
+                 for level in self.LEVELS for stat in self.STATS}
+        if all(self.storage.exists(name) for name in names.values()):
+            aggregates = {level: {stat: self.storage.read(names[level, stat], mmap=True) for stat in self.STATS}
+                          for level in self.LEVELS}
+        else:
+            aggregates = self._aggregate(df)
+
+        levels = {}
+        for level, frames in aggregates.items():
+            mean = np.asfortranarray(frames["mean"].reindex(columns=df.columns).to_numpy(dtype=np.float64))
+            levels[level] = {
+                "days": frames["mean"].index.values.astype("datetime64[D]").astype(np.int64),
+                "mean": mean,
+                "min": np.asfortranarray(frames["min"].reindex(columns=df.columns).to_numpy(dtype=np.float64)),
+                "max": np.asfortranarray(frames["max"].reindex(columns=df.columns).to_numpy(dtype=np.float64)),
+                "mask": np.asfortranarray(~np.isnan(mean)),
+            }
+        return levels
+
+    def _load(self, version):
+        frames = {}
+        for category in self.categories:
+            if self.storage.exists(self._name(category)):
+                frames[category] = self._read(category)
+
+        index = pd.DatetimeIndex([])
+        for df in frames.values():
+            index = index.union(df.index)
+        days = index.values.astype("datetime64[D]").astype(np.int64)
+
+        subsets = {}
+        for category, df in frames.items():
+            values = np.asfortranarray(df.reindex(index).to_numpy(dtype=np.float64))
+            mask = np.asfortranarray(~np.isnan(values))
+            metrics = list(df.columns)
+            subsets[category] = {
+                "metrics": metrics,
+                "positions": {metric: i for i, metric in enumerate(metrics)},
+                "values": values,
+                "mask": mask,
+                "days": days,
+                "levels": {"day": {"days": days, "mean": values, "min": values, "max": values, "mask": mask},
+                           **self._load_levels(category, df)},
+            }
+
+        self._subsets, self._version = subsets, version
+        print(f"Subset store loaded {len(subsets)} subsets ({len(index)} dates).")
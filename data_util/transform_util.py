@@ -1,26 +1,201 @@
+import os
 import numpy as np
 import pandas as pd
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
 
+from .config import Config
+
 class TransformUtil:
+    # Persisted streaming statistics of the incremental indicators
+    STATE_PATH = os.path.join("Data", "Cache", "Indicators")
+
     @staticmethod
-    def create_indicator(indicator_name, df, scaler="minmax", method="mean", explained_var=0.8):
+    def create_indicator(indicator_name, df, scaler="minmax", method="mean", explained_var=0.8, incremental=None):
+        if incremental is None:
+            incremental = Config.INCREMENTAL_INDICATORS
+        observed = df.notna().all(axis=1)
         if df.isnull().values.any():
             df = df.interpolate(method="linear", limit_direction="both")
 
+        if incremental and df.shape[1] > 1:
+            return TransformUtil._create_indicator_incremental(indicator_name, df, observed, scaler, method, explained_var)
+
         scaler = MinMaxScaler() if scaler == "minmax" else StandardScaler()
         df_scaled = pd.DataFrame(scaler.fit_transform(df), index=df.index, columns=df.columns)
 
         if df_scaled.shape[1] == 1:
             return df_scaled.rename(columns={df_scaled.columns[0]: "PCA_Indicator"})
 
-        pca = PCA()
-        pca_transformed = pca.fit_transform(df_scaled)
-        explained_variance_ratio = np.cumsum(pca.explained_variance_ratio_)
-        n_components = np.argmax(explained_variance_ratio >= explained_var) + 1
+        pca_transformed, n_components = TransformUtil._fit_pca(df_scaled, explained_var)
 
         pca_indicator = np.mean(pca_transformed[:, :n_components], axis=1) if method == "mean" else np.sum(pca_transformed[:, :n_components], axis=1)
         print(f"Processed with {n_components} PCA components explaining ≥ {explained_var*100:.1f}% variance.")
 
-        return pd.DataFrame(pca_indicator, index=df.index, columns=[indicator_name])
\ No newline at end of file
+        return pd.DataFrame(pca_indicator, index=df.index, columns=[indicator_name])
+
+    @staticmethod
+    def _fit_pca(df_scaled, explained_var, full_svd_max_cols=20):
+        """
+        Returns (transformed data, number of components reaching explained_var). Narrow frames use the
+        full SVD; wide ones fit a truncated randomized PCA and only grow it until explained_var is reached.
+        """
+        n_rows, n_cols = df_scaled.shape
+        max_components = min(n_rows, n_cols)
+        if n_cols <= full_svd_max_cols:
+            pca = PCA()
+            pca_transformed = pca.fit_transform(df_scaled)
+            explained_variance_ratio = np.cumsum(pca.explained_variance_ratio_)
+            return pca_transformed, int(np.argmax(explained_variance_ratio >= explained_var) + 1)
+
+        k = min(8, max_components - 1)
+        while True:
+            pca = PCA(n_components=k, svd_solver="randomized", random_state=0)
+            pca_transformed = pca.fit_transform(df_scaled)
+            explained_variance_ratio = np.cumsum(pca.explained_variance_ratio_)
+            if explained_variance_ratio[-1] >= explained_var or k >= max_components - 1:
+                break
+            k = min(2 * k, max_components - 1)
+        n_components = int(np.argmax(explained_variance_ratio >= explained_var) + 1) \
+            if explained_variance_ratio[-1] >= explained_var else k
+        return pca_transformed, n_components
+
+    @staticmethod
+    def _create_indicator_incremental(indicator_name, df, observed, scaler, method, explained_var):
+        """
+        Streaming variant: keeps count, mean, centered cross-products and min/max of the raw columns on
+        disk and only folds in rows after the last absorbed date. The scaled covariance and its principal
+        axes follow from those statistics exactly, so no pass over the full history is needed. Rows after
+        the last fully observed row (edge-filled by the interpolation) are transformed but not absorbed.
+        The state is rebuilt from scratch when the number of components reaching explained_var changes,
+        when already absorbed rows were revised, and at least every Config.INDICATOR_REFIT_DAYS days.
+        """
+        columns = [str(col) for col in df.columns]
+        state = TransformUtil._load_state(indicator_name)
+        absorb_until = observed[observed].index.max() if observed.any() else df.index.max()
+        reason = TransformUtil._refit_reason(state, df, columns, scaler)
+        if reason is not None:
+            print(f"{indicator_name}: {reason}, full refit.")
+            state = TransformUtil._refit(df, columns, scaler, absorb_until)
+            new_rows = df[df.index <= absorb_until]
+        else:
+            new_rows = df[(df.index > state["watermark"]) & (df.index <= absorb_until)]
+            TransformUtil._absorb(state, new_rows.to_numpy(dtype=np.float64))
+            state["watermark"] = max(state["watermark"], absorb_until)
+
+        components, n_components = TransformUtil._principal_axes(state, explained_var)
+        if reason is None and n_components != state["n_components"]:
+            print(f"{indicator_name}: PCA component count changed ({state['n_components']} -> {n_components}), "
+                  f"full refit.")
+            state = TransformUtil._refit(df, columns, scaler, absorb_until)
+            components, n_components = TransformUtil._principal_axes(state, explained_var)
+        state["n_components"] = n_components
+        TransformUtil._save_state(indicator_name, state)
+
+        scale = TransformUtil._scale(state)
+        pca_transformed = ((df.to_numpy(dtype=np.float64) - state["mean"]) / scale) @ components[:, :n_components]
+        pca_indicator = np.mean(pca_transformed, axis=1) if method == "mean" else np.sum(pca_transformed, axis=1)
+        print(f"Processed with {n_components} PCA components explaining ≥ {explained_var*100:.1f}% variance "
+              f"({len(new_rows)} new rows absorbed).")
+
+        return pd.DataFrame(pca_indicator, index=df.index, columns=[indicator_name])
+
+    @staticmethod
+    def _refit_reason(state, df, columns, scaler):
+        """Why the state has to be rebuilt from the full history, None if it can be updated incrementally."""
+        if state is None:
+            return "no saved state"
+        if state["columns"] != columns or state["scaler"] != scaler:
+            return "columns or scaler changed"
+        if state["refit_at"] == pd.Timestamp.min:
+            return "no full refit recorded"
+        if pd.Timestamp.now() - state["refit_at"] >= pd.Timedelta(days=Config.INDICATOR_REFIT_DAYS):
+            return f"last full refit on {state['refit_at'].date()}"
+        # Revisions of absorbed rows: the column sums no longer match the running mean
+        absorbed = df[df.index <= state["watermark"]].to_numpy(dtype=np.float64)
+        if len(absorbed) != state["n"] or not np.allclose(absorbed.sum(axis=0), state["mean"] * state["n"],
+                                                          rtol=1e-9, atol=1e-6):
+            return "absorbed rows were revised"
+        return None
+
+    @staticmethod
+    def _refit(df, columns, scaler, absorb_until):
+        state = TransformUtil._empty_state(columns, scaler)
+        TransformUtil._absorb(state, df[df.index <= absorb_until].to_numpy(dtype=np.float64))
+        state["watermark"] = absorb_until
+        state["refit_at"] = pd.Timestamp.now().normalize()
+        return state
+
+    @staticmethod
+    def _empty_state(columns, scaler):
+        p = len(columns)
+        return {"columns": columns, "scaler": scaler, "n": 0, "mean": np.zeros(p), "m2": np.zeros((p, p)),
+                "min": np.full(p, np.inf), "max": np.full(p, -np.inf), "watermark": pd.Timestamp.min,
+                "n_components": 0, "refit_at": pd.Timestamp.min}
+
+    @staticmethod
+    def _absorb(state, X):
+        """Merges a batch into the running statistics (Chan et al. parallel update, numerically stable)."""
+        if len(X) == 0:
+            return
+        n_b = len(X)
+        mean_b = X.mean(axis=0)
+        centered = X - mean_b
+        m2_b = centered.T @ centered
+        n = state["n"]
+        delta = mean_b - state["mean"]
+        total = n + n_b
+        state["mean"] = state["mean"] + delta * n_b / total
+        state["m2"] = state["m2"] + m2_b + np.outer(delta, delta) * n * n_b / total
+        state["n"] = total
+        state["min"] = np.minimum(state["min"], X.min(axis=0))
+        state["max"] = np.maximum(state["max"], X.max(axis=0))
+
+    @staticmethod
+    def _scale(state):
+        if state["scaler"] == "minmax":
+            scale = state["max"] - state["min"]
+        else:
+            scale = np.sqrt(np.diag(state["m2"]) / state["n"])
+        # Constant columns are left unscaled, like sklearn's scalers do
+        return np.where(scale == 0, 1.0, scale)
+
+    @staticmethod
+    def _principal_axes(state, explained_var):
+        scale = TransformUtil._scale(state)
+        covariance = state["m2"] / max(state["n"] - 1, 1) / np.outer(scale, scale)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1]
+        eigenvalues, components = np.clip(eigenvalues[order], 0, None), eigenvectors[:, order]
+        # Same sign convention as sklearn's PCA: largest absolute loading of each axis is positive
+        signs = np.sign(components[np.argmax(np.abs(components), axis=0), np.arange(components.shape[1])])
+        components = components * np.where(signs == 0, 1.0, signs)
+        explained_variance_ratio = np.cumsum(eigenvalues) / eigenvalues.sum()
+        return components, int(np.argmax(explained_variance_ratio >= explained_var) + 1)
+
+    @staticmethod
+    def _state_file(indicator_name):
+        return os.path.join(TransformUtil.STATE_PATH, f"{indicator_name.replace('/', '_')}.npz")
+
+    @staticmethod
+    def _load_state(indicator_name):
+        path = TransformUtil._state_file(indicator_name)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return {"columns": data["columns"].tolist(), "scaler": str(data["scaler"]), "n": int(data["n"]),
+                    "mean": data["mean"], "m2": data["m2"], "min": data["min"], "max": data["max"],
+                    "watermark": pd.Timestamp(int(data["watermark"])), "n_components": int(data["n_components"]),
+                    # States saved before periodic refits get one on their next update
+                    "refit_at": pd.Timestamp(int(data["refit_at"])) if "refit_at" in data else pd.Timestamp.min}
+
+    @staticmethod
+    def _save_state(indicator_name, state):
+        os.makedirs(TransformUtil.STATE_PATH, exist_ok=True)
+        path = TransformUtil._state_file(indicator_name)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, columns=np.array(state["columns"]), scaler=np.array(state["scaler"]),
+                 n=np.array(state["n"]), mean=state["mean"], m2=state["m2"], min=state["min"], max=state["max"],
+                 watermark=np.array(pd.Timestamp(state["watermark"]).value), n_components=np.array(state["n_components"]),
+                 refit_at=np.array(pd.Timestamp(state["refit_at"]).value))
+        os.replace(tmp_path, path)
@@ -0,0 +1,137 @@
+"""
+Background forecast jobs.
+
+A fixed pool of worker threads owns the model and runs the forecasts, so Flask request threads only submit a
+job and poll it. Jobs are identified by a key (data version, model version and forecast parameters): submitting
+a key that is already queued, running or recently finished returns that job instead of computing it again. The
+number of waiting jobs is bounded; beyond it submit raises QueueFull and the endpoint answers 503.
+"""
+import queue
+import threading
+import time
+import uuid
+
+from data_util.config import Config
+from data_util.metrics_util import FORECAST_JOB_SECONDS, FORECAST_JOB_WAIT_SECONDS
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key, fn):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.fn = fn
+        self.status = "queued"
+        self.stage = "queued"
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def report(self, stage, progress):
+        """Progress callback handed to the job function: stage name and a fraction in [0, 1]."""
+        self.stage = stage
+        self.progress = progress
+
+    def to_dict(self):
+        return {"job_id": self.id, "status": self.status, "stage": self.stage, "progress": round(self.progress, 3),
+                "error": self.error, "submitted_at": self.submitted_at, "started_at": self.started_at,
+                "finished_at": self.finished_at}
+
+
+class InferenceQueue:
+    def __init__(self, workers=None, max_pending=None, result_ttl=None):
+        self.workers = workers or Config.INFERENCE_WORKERS
+        self.max_pending = max_pending or Config.INFERENCE_QUEUE_SIZE
+        self.result_ttl = result_ttl or Config.INFERENCE_RESULT_TTL
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"inference-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, key, fn):
+        """
+        Queues fn(report) under key and returns (job, created). An unexpired job with the same key is
+        returned instead (created=False). Raises QueueFull when max_pending jobs are already waiting.
+        """
+        self.start()
+        with self._lock:
+            self._expire()
+            job = self._by_key.get(key)
+            if job is not None and job.status != "failed":
+                self._stats["coalesced"] += 1
+                return job, False
+            if self._queue.qsize() >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise QueueFull(f"{self.max_pending} forecasts are already waiting")
+            job = Job(key, fn)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._stats["submitted"] += 1
+            self._queue.put(job)
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def run(self, key, fn, timeout=None):
+        """Submits (or joins) the job and waits for it; returns the result or raises its error."""
+        job, _ = self.submit(key, fn)
+        if not job.done.wait(timeout):
+            raise TimeoutError(f"Forecast job {job.id} did not finish within {timeout}s")
+        if job.status == "failed":
+            raise RuntimeError(job.error)
+        return job.result
+
+    def stats(self):
+        with self._lock:
+            running = sum(job.status == "running" for job in self._jobs.values())
+            return {**self._stats, "queued": self._queue.qsize(), "running": running, "workers": self.workers,
+                    "max_pending": self.max_pending}
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.status, job.started_at = "running", time.time()
+            FORECAST_JOB_WAIT_SECONDS.observe(job.started_at - job.submitted_at)
+            try:
+                job.result = job.fn(job.report)
+                job.status = "done"
+                job.report("done", 1.0)
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+                print(f"Forecast job {job.id} failed: {e}")
+            finally:
+                job.finished_at = time.time()
+                FORECAST_JOB_SECONDS.observe(job.finished_at - job.started_at, status=job.status)
+                with self._lock:
+                    self._stats["completed" if job.status == "done" else "failed"] += 1
+                job.done.set()
+                self._queue.task_done()
+
+    def _expire(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
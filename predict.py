@@ -1,40 +1,498 @@
 import numpy as np
 import torch
 import pandas as pd
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pytorch_forecasting import TimeSeriesDataSet
 from pytorch_forecasting.models.temporal_fusion_transformer import TemporalFusionTransformer
+from pytorch_forecasting.utils import move_to_device
+from data_util.cache_util import FileFingerprint, LRUCache
+from data_util.config import Config
+from data_util.metrics_util import MODEL_LOAD_SECONDS, PREDICTION_SECONDS
 torch.set_float32_matmul_precision('high')
 
 
 MODEL_PATH = "Models/TFT_Model_3.ckpt"
+QUANTIZED_SUFFIX = ".int8.pt"
 
-def load_model():
-    """Load the trained TFT model from disk"""
-    best_tft = TemporalFusionTransformer.load_from_checkpoint(MODEL_PATH, map_location=torch.device("cpu"))
+
+def configure_torch_threads(num_threads=None, interop_threads=None):
+    """
+    Sets torch's intra-op/inter-op thread pools of this worker process. Without an explicit setting
+    the cores are split among WEB_CONCURRENCY workers so several workers on one host don't
+    oversubscribe them. Inter-op threads can only be set before the first parallel op runs.
+    """
+    num_threads = num_threads or Config.TORCH_NUM_THREADS
+    if num_threads is None and Config.WEB_CONCURRENCY > 1:
+        num_threads = max(1, (os.cpu_count() or 1) // Config.WEB_CONCURRENCY)
+    interop_threads = interop_threads or Config.TORCH_NUM_INTEROP_THREADS
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            print(f"Warning: could not set torch inter-op threads: {e}")
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def inference_device():
+    """Device for inference: Config.INFERENCE_DEVICE, or CUDA when available and CPU otherwise."""
+    if Config.INFERENCE_DEVICE != "auto":
+        return torch.device(Config.INFERENCE_DEVICE)
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+configure_torch_threads()
+
+
+def _load_checkpoint(path):
+    """Load the trained TFT model (Lightning checkpoint or exported .pt artifact) from disk"""
+    if path.endswith(".pt"):
+        # Exported modules are pickled whole (dynamically quantized layers run on CPU only)
+        best_tft = torch.load(path, map_location="cpu", weights_only=False)
+    else:
+        best_tft = TemporalFusionTransformer.load_from_checkpoint(path, map_location=inference_device())
     best_tft.eval()
     return best_tft
 
-def run_tft_prediction(model, data, max_prediction_length):
-    """Runs inference on TFT and ensures predictions are extracted correctly with print logging."""
+
+def quantized_artifact_path(path=MODEL_PATH):
+    return os.path.splitext(path)[0] + QUANTIZED_SUFFIX
+
+
+def artifact_metadata(artifact_path):
+    """Export report written next to the artifact by scripts/export_model.py, None if there is none."""
+    meta_path = f"{artifact_path}.json"
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+_checkpoint_fingerprints = {}
+
+
+def resolve_model_path(path=MODEL_PATH):
+    """
+    The int8 artifact of a checkpoint if serving it is allowed (Config.MODEL_ARTIFACT, CPU device) and
+    it passed its parity check against the current checkpoint content; the checkpoint itself otherwise.
+    """
+    if Config.MODEL_ARTIFACT == "checkpoint" or inference_device().type != "cpu":
+        return path
+    artifact = quantized_artifact_path(path)
+    meta = artifact_metadata(artifact)
+    if meta is None or not meta.get("parity_passed") or not os.path.exists(artifact):
+        return path
+    fingerprint = _checkpoint_fingerprints.setdefault(path, FileFingerprint(path))
+    if os.path.exists(path) and meta.get("source_digest") != fingerprint.digest():
+        return path  # Exported from an older checkpoint
+    return artifact
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded TFT models.
+
+    Each checkpoint is deserialized once per process. On access the checkpoint's mtime is checked
+    (at most every `check_interval` seconds) and, if its content hash changed, the first request to
+    notice loads and warms up the new model while all other requests keep using the previous one.
+    The swap itself is a single reference assignment under a lock.
+
+    `serve` does the same when the path a logical model resolves to changes (int8 artifact <-> checkpoint):
+    the new model is loaded and warmed up in the background, published atomically and the replaced entry
+    is evicted, so only one of the two stays resident.
+    """
+
+    # Seconds before a failed background switch to another path is retried
+    SWITCH_RETRY_INTERVAL = 60.0
+
+    def __init__(self, loader=_load_checkpoint, check_interval=5.0):
+        self.loader = loader
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._fingerprints = {}
+        self._warmups = []
+        self._serving = {}
+        self._switching = set()
+        self._switch_failed = {}
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "reloads": 0, "switches": 0, "evictions": 0,
+                       "load_errors": 0,
+                       "last_load_seconds": None, "total_load_seconds": 0.0}
+
+    def add_warmup(self, fn):
+        """Registers fn(model), run on every freshly loaded model before it is published."""
+        self._warmups.append(fn)
+
+    def get(self, path=MODEL_PATH):
+        entry = self._entries.get(path)
+        if entry is not None:
+            if time.monotonic() - entry["checked_at"] >= self.check_interval:
+                entry["checked_at"] = time.monotonic()
+                if entry["fingerprint"].changed():
+                    self._reload(path, entry)
+                    entry = self._entries[path]
+            self._count("hits")
+            return entry["model"]
+
+        self._count("misses")
+        with self._load_lock(path):
+            entry = self._entries.get(path)
+            if entry is None:
+                entry = self._load(path)
+                self._publish(path, entry)
+        return entry["model"]
+
+    def serve(self, name, path):
+        """
+        Model of the logical model name (its checkpoint path) that currently resolves to path. The first call
+        loads synchronously; when path differs from the served one later, the served model keeps answering
+        until the background switch to path has completed.
+        """
+        with self._lock:
+            current = self._serving.get(name)
+        if current is None or current == path or current not in self._entries:
+            model = self.get(path)
+            with self._lock:
+                previous = self._serving.get(name)
+                self._serving[name] = path
+            if previous is not None and previous != path:
+                self._evict(previous)
+            return model
+        model = self.get(current)
+        self._switch(name, current, path)
+        return model
+
+    def serving(self, name):
+        """Path of the model currently served for name, None before the first serve."""
+        return self._serving.get(name)
+
+    def preload(self, path=MODEL_PATH, name=None):
+        """Loads and warms up the model ahead of the first request."""
+        try:
+            self.serve(name, path) if name is not None else self.get(path)
+        except Exception as e:
+            print(f"Error preloading model {path}: {e}")
+
+    def digest(self, path=MODEL_PATH):
+        """Content hash of the checkpoint the currently published model was loaded from."""
+        entry = self._entries.get(path)
+        return entry["digest"] if entry is not None else self._fingerprint(path).digest()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["models"] = {path: {"digest": entry["digest"], "loaded_at": entry["loaded_at"],
+                                      "load_seconds": entry["load_seconds"]}
+                               for path, entry in self._entries.items()}
+        return stats
+
+    def _reload(self, path, entry):
+        lock = self._load_lock(path)
+        if not lock.acquire(blocking=False):
+            return  # Another request is already loading the new checkpoint; keep serving the old one.
+        try:
+            fingerprint = entry["fingerprint"]
+            if fingerprint.digest() == entry["digest"]:
+                return  # Touched but unchanged
+            try:
+                new_entry = self._load(path, fingerprint)
+            except Exception as e:
+                self._count("load_errors")
+                print(f"Error reloading model {path}, keeping the previous one: {e}")
+                return
+            self._publish(path, new_entry)
+            self._count("reloads")
+            print(f"Model {path} hot-swapped ({new_entry['digest'][:12]}).")
+        finally:
+            lock.release()
+
+    def _switch(self, name, current, path):
+        with self._lock:
+            failed = self._switch_failed.get((name, path))
+            if name in self._switching or (failed is not None
+                                           and time.monotonic() - failed < self.SWITCH_RETRY_INTERVAL):
+                return
+            self._switching.add(name)
+        threading.Thread(target=self._run_switch, args=(name, current, path), name="model-switch",
+                         daemon=True).start()
+
+    def _run_switch(self, name, current, path):
+        try:
+            with self._load_lock(path):
+                entry = self._entries.get(path) or self._load(path)
+            with self._lock:
+                self._entries[path] = entry
+                self._serving[name] = path
+                self._switch_failed.pop((name, path), None)
+                self._stats["switches"] += 1
+            self._evict(current)
+            print(f"Model {name} switched from {current} to {path}.")
+        except Exception as e:
+            with self._lock:
+                self._switch_failed[(name, path)] = time.monotonic()
+            self._count("load_errors")
+            print(f"Error switching model {name} to {path}, keeping {current}: {e}")
+        finally:
+            with self._lock:
+                self._switching.discard(name)
+
+    def _evict(self, path):
+        """Drops the entry of path unless some logical model is still served from it."""
+        with self._lock:
+            if path in self._serving.values() or self._entries.pop(path, None) is None:
+                return
+            self._stats["evictions"] += 1
+        print(f"Model {path} evicted.")
+
+    def _load(self, path, fingerprint=None):
+        fingerprint = fingerprint or self._fingerprint(path)
+        digest = fingerprint.digest()
+        if digest is None:
+            raise FileNotFoundError(f"Model checkpoint not found: {path}")
+
+        start = time.perf_counter()
+        model = self.loader(path)
+        load_seconds = time.perf_counter() - start
+        MODEL_LOAD_SECONDS.observe(load_seconds)
+        # Lets warm-ups and caches key on the checkpoint before the model is published
+        model.checkpoint_digest = digest
+        for warmup in self._warmups:
+            try:
+                warmup(model)
+            except Exception as e:
+                print(f"Warning: model warm-up failed: {e}")
+
+        with self._lock:
+            self._stats["loads"] += 1
+            self._stats["last_load_seconds"] = load_seconds
+            self._stats["total_load_seconds"] += load_seconds
+        print(f"Model {path} loaded in {load_seconds:.2f}s.")
+        return {"model": model, "fingerprint": fingerprint, "digest": digest, "load_seconds": load_seconds,
+                "loaded_at": time.time(), "checked_at": time.monotonic()}
+
+    def _publish(self, path, entry):
+        with self._lock:
+            self._entries[path] = entry
+
+    def _fingerprint(self, path):
+        """One fingerprint per path, so unchanged checkpoints are not re-hashed (mtime/size check only)."""
+        with self._lock:
+            return self._fingerprints.setdefault(path, FileFingerprint(path))
+
+    def _load_lock(self, path):
+        with self._lock:
+            return self._load_locks.setdefault(path, threading.Lock())
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+
+model_registry = ModelRegistry()
+
+
+def load_model(path=MODEL_PATH):
+    """
+    Returns the process-wide cached TFT model, loading it on first use. A valid exported int8
+    artifact of the checkpoint is served instead of the checkpoint (see resolve_model_path); switching
+    between the two happens in the background (see ModelRegistry.serve).
+    """
+    return model_registry.serve(path, resolve_model_path(path))
+
+def preload_model(path=MODEL_PATH):
+    """Loads and warms up the model load_model will serve, ahead of the first request."""
+    model_registry.preload(resolve_model_path(path), name=path)
+
+def model_digest(path=MODEL_PATH):
+    """Checkpoint hash of the model load_model currently serves for path."""
+    return model_registry.digest(model_registry.serving(path) or resolve_model_path(path))
+
+class ForecastCache:
+    """
+    LRU cache of serialized forecast payloads keyed by
+    (dataset hash, model hash, encoder length, prediction length, prediction start).
+
+    Entries belonging to an older dataset or model version are dropped as soon as a request with a
+    new version arrives, so a refresh or a hot-swapped checkpoint invalidates the cache automatically.
+    """
+
+    def __init__(self, max_entries=64):
+        self._cache = LRUCache(max_entries)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, dataset_digest, model_digest, max_encoder_length, max_prediction_length,
+                       prediction_start, compute):
+        version = (dataset_digest, model_digest)
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+
+        key = version + (max_encoder_length, max_prediction_length, str(prediction_start))
+        payload = self._cache.get(key)
+        if payload is None:
+            payload = compute()
+            with self._lock:
+                if version == self._version:
+                    self._cache.put(key, payload)
+        return payload
+
+    def stats(self):
+        return {"entries": len(self._cache), "hits": self._cache.hits, "misses": self._cache.misses}
+
+
+class InferenceDatasetCache:
+    """
+    LRU cache of prediction windows and their inference TimeSeriesDataSets keyed by
+    (dataset hash, encoder length, prediction length, prediction start).
+
+    The window (preprocessing of the data) does not depend on the model, so an entry outlives a model swap;
+    the dataset (categorical encoders, normalizers, index and tensors, from the model's dataset parameters)
+    is built per model digest inside the entry. With a cached entry repeated predictions of the same window
+    run on the stored, already collated batches directly. Also keeps the timing breakdown
+    (dataset build / forward pass / postprocessing) of the predictions.
+    """
+
+    def __init__(self, max_entries=8, batch_size=None, num_workers=None):
+        self._cache = LRUCache(max_entries)
+        self.batch_size = Config.INFERENCE_BATCH_SIZE if batch_size is None else batch_size
+        self.num_workers = Config.INFERENCE_NUM_WORKERS if num_workers is None else num_workers
+        self._lock = threading.Lock()
+        self._timings = {"predictions": 0, "dataset_builds": 0, "dataset_build_seconds": 0.0,
+                         "forward_seconds": 0.0, "postprocess_seconds": 0.0, "window_hits": 0, "last": None}
+
+    def get(self, model, data, key=None):
+        """
+        Returns (entry, build seconds); build seconds is 0 when the model's dataset came from the cache.
+        data is the window DataFrame or a callable returning it, only called when the window is not cached.
+        The entry holds the window ("data") and the model's "dataset", "dataloader" and per-device "batches".
+        """
+        window = self._cache.get(key) if key is not None else None
+        model_key = getattr(model, "checkpoint_digest", None) or id(model)
+        if window is not None:
+            entry = window["models"].get(model_key)
+            if entry is not None:
+                return entry, 0.0
+            with self._lock:
+                self._timings["window_hits"] += 1
+
+        start = time.perf_counter()
+        if window is None:
+            window = {"data": data() if callable(data) else data, "models": {}}
+            if key is not None:
+                self._cache.put(key, window)
+        data = window["data"]
+        dataset = TimeSeriesDataSet.from_parameters(model.dataset_parameters, data, predict=True,
+                                                    stop_randomization=True)
+        dataloader = dataset.to_dataloader(train=False, batch_size=max(1, min(self.batch_size, len(dataset))),
+                                           num_workers=self.num_workers,
+                                           persistent_workers=self.num_workers > 0)
+        build_seconds = time.perf_counter() - start
+        entry = {"data": data, "dataset": dataset, "dataloader": dataloader, "batches": {}}
+        # Only the current model's dataset is kept: a replaced model's tensors are not reused
+        window["models"] = {model_key: entry}
+        return entry, build_seconds
+
+    @staticmethod
+    def batches(entry, device):
+        """Collated input batches of an entry, moved to device once and kept."""
+        batches = entry["batches"].get(str(device))
+        if batches is None:
+            batches = [move_to_device(x, device) for x, _ in entry["dataloader"]]
+            entry["batches"][str(device)] = batches
+        return batches
+
+    def record(self, timings):
+        for name in ("dataset_build", "forward", "postprocess"):
+            PREDICTION_SECONDS.observe(timings[name], phase=name)
+        PREDICTION_SECONDS.observe(sum(timings[name] for name in ("dataset_build", "forward", "postprocess")),
+                                   phase="total")
+        with self._lock:
+            self._timings["predictions"] += 1
+            self._timings["dataset_builds"] += timings["dataset_build"] > 0
+            for name in ("dataset_build", "forward", "postprocess"):
+                self._timings[f"{name}_seconds"] += timings[name]
+            self._timings["last"] = dict(timings)
+
+    def stats(self):
+        with self._lock:
+            return {**self._timings, "entries": len(self._cache), "hits": self._cache.hits,
+                    "misses": self._cache.misses}
+
+
+inference_datasets = InferenceDatasetCache()
+
+
+def prediction_window_bounds(max_encoder_length, max_prediction_length, prediction_start=None):
+    """(first, last) date of the encoder + decoder window around the prediction start (today by default)."""
+    if prediction_start is None:
+        prediction_start = pd.Timestamp(datetime.today().date())
+    training_cutoff = prediction_start - pd.Timedelta(days=1)
+    return training_cutoff - timedelta(days=max_encoder_length), prediction_start + timedelta(days=max_prediction_length)
+
+def prepare_prediction_window(df_final, max_encoder_length, max_prediction_length, prediction_start=None):
+    """Selects the encoder + decoder window around the prediction start (today by default)."""
+    window_start, window_end = prediction_window_bounds(max_encoder_length, max_prediction_length, prediction_start)
+
+    filtered_data = df_final[
+        (df_final.index >= window_start) &
+        (df_final.index <= window_end)
+        ].copy()
+    filtered_data["time_idx"] = filtered_data["time_idx"].astype(int)
+    return filtered_data
+
+def model_device(model):
+    return next(model.parameters()).device
+
+def predict_quantiles(model, batches):
+    """
+    Forward pass over collated batches without a Lightning Trainer (no callbacks, loggers or
+    accelerator setup). Same output as model.predict(..., mode="quantiles"): (samples, horizon, quantiles).
+    In predict mode every sample decodes the model's full horizon, so all batches have the same length.
+    """
+    if not batches:
+        return None
+    model.eval()
+    with torch.inference_mode():
+        return torch.cat([model.to_quantiles(model(x)) for x in batches])
+
+def run_tft_prediction(model, data, max_prediction_length, dataset_key=None, report=None):
+    """
+    Runs inference on TFT and ensures predictions are extracted correctly with print logging.
+    With a dataset_key the window is prepared once and reused, and its inference dataset/dataloader once per
+    model; data can then also be a callable that prepares the window only when it is not cached yet.
+    report(stage, fraction), if given, is told when the forward pass and postprocessing start.
+    """
 
     print("Starting TFT prediction...")
 
-    new_raw_predictions = model.predict(
-        data,
-        mode="quantiles",
-        return_x=True,
-        return_y=True,
-        trainer_kwargs={"accelerator": "gpu"},
-    )
+    entry, build_seconds = inference_datasets.get(model, data, dataset_key)
+    data = entry["data"]
+    timings = {"dataset_build": build_seconds}
+
+    if report is not None:
+        report("predicting", 0.6)
+    start = time.perf_counter()
+    predicted_quantiles = predict_quantiles(model, inference_datasets.batches(entry, model_device(model)))
+    timings["forward"] = time.perf_counter() - start
+    start = time.perf_counter()
+    if report is not None:
+        report("postprocessing", 0.85)
 
-    if new_raw_predictions is None or len(new_raw_predictions[0]) == 0:
+    if predicted_quantiles is None or len(predicted_quantiles) == 0:
         print("Error: Model returned no predictions.")
         return pd.DataFrame()  # Return empty DataFrame if no predictions
 
     print("TFT prediction completed successfully.")
 
-    # Extract quantiles
-    predicted_quantiles = new_raw_predictions[0]
-
     print(f"Shape of raw predictions: {predicted_quantiles.shape}")
 
     quantile_05 = predicted_quantiles[:, :, 0].detach().cpu().numpy().squeeze()
@@ -74,5 +532,89 @@ def run_tft_prediction(model, data, max_prediction_length):
         "Close"
     ] = np.nan
 
+    timings["postprocess"] = time.perf_counter() - start
+    inference_datasets.record(timings)
+    print(f"TFT timings: dataset build {timings['dataset_build']:.3f}s, forward {timings['forward']:.3f}s, "
+          f"postprocess {timings['postprocess']:.3f}s")
+
     print("Predictions DataFrame after merging with dates:")
-    return predictions_df
\ No newline at end of file
+    return predictions_df
+
+def check_window_lengths(model, windows):
+    """
+    Returns the model's trained horizon; raises ValueError for windows whose prediction length exceeds it
+    or whose encoder length is outside the model's encoder range.
+    """
+    parameters = model.dataset_parameters
+    horizon = parameters["max_prediction_length"]
+    min_encoder, max_encoder = parameters["min_encoder_length"], parameters["max_encoder_length"]
+    for prediction_start, max_encoder_length, max_prediction_length in windows:
+        if max_prediction_length > horizon:
+            raise ValueError(f"Prediction length {max_prediction_length} exceeds the model horizon of {horizon} days")
+        if not min_encoder <= max_encoder_length <= max_encoder:
+            raise ValueError(f"Encoder length {max_encoder_length} is outside the model's range "
+                             f"{min_encoder}-{max_encoder}")
+    return horizon
+
+def run_tft_batch_prediction(model, df_final, windows, actuals=None, batch_size=None, frames=None):
+    """
+    Forecasts several (prediction start, encoder length, prediction length) windows of one preprocessed
+    frame. Every window becomes one inference sample; the samples are collated into batches of up to
+    batch_size (Config.INFERENCE_BATCH_SIZE) and run through a single forward pass per batch, so the
+    cost grows with the number of batches rather than with the number of windows.
+    Returns one dict per window with the decoder dates, the realized Close from `actuals` (the raw
+    Close series; None where unknown) and the lower/median/upper quantiles. `frames` (one preprocessed
+    frame per window, e.g. point-in-time windows of a backtest) are used instead of df_final.
+    The model always decodes its trained horizon: every window is built to it and the first prediction
+    length steps are returned. Lengths the model cannot serve raise ValueError (see check_window_lengths).
+    """
+    batch_size = batch_size or inference_datasets.batch_size
+    timings = {"dataset_build": 0.0, "forward": 0.0, "postprocess": 0.0}
+    model_horizon = check_window_lengths(model, windows)
+
+    start = time.perf_counter()
+    samples, horizons = [], []
+    for i, (prediction_start, max_encoder_length, max_prediction_length) in enumerate(windows):
+        source = frames[i] if frames is not None else df_final
+        window = prepare_prediction_window(source, max_encoder_length, model_horizon, prediction_start)
+        try:
+            dataset = TimeSeriesDataSet.from_parameters(model.dataset_parameters, window, predict=True,
+                                                        stop_randomization=True)
+            samples.append(dataset[len(dataset) - 1])
+        except (AssertionError, ValueError, IndexError) as e:
+            raise ValueError(f"Window {pd.Timestamp(prediction_start).date()} "
+                             f"({max_encoder_length}/{max_prediction_length}) cannot be predicted: {e}") from e
+        horizons.append(window.iloc[-model_horizon:])
+    timings["dataset_build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    device = model_device(model)
+    batches = [move_to_device(TimeSeriesDataSet._collate_fn(samples[i:i + batch_size])[0], device)
+               for i in range(0, len(samples), batch_size)]
+    predicted_quantiles = predict_quantiles(model, batches)
+    timings["forward"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted_quantiles = predicted_quantiles.detach().cpu().numpy()
+    results = []
+    for (prediction_start, max_encoder_length, max_prediction_length), horizon, quantiles in zip(
+            windows, horizons, predicted_quantiles):
+        # Dates, actuals and quantiles are cut to the same first steps of the decoded horizon
+        length = max_prediction_length
+        horizon = horizon.iloc[:length]
+        close = (actuals.reindex(horizon.index) if actuals is not None else horizon["Close"]).astype(float)
+        results.append({
+            "prediction_start": str(pd.Timestamp(prediction_start).date()),
+            "max_encoder_length": max_encoder_length,
+            "max_prediction_length": max_prediction_length,
+            "dates": [str(date.date()) for date in horizon.index],
+            "Close": [None if np.isnan(value) else value for value in close.tolist()],
+            "Lower_Bound": quantiles[:length, 0].tolist(),
+            "Predicted_Median": quantiles[:length, 1].tolist(),
+            "Upper_Bound": quantiles[:length, 2].tolist(),
+        })
+    timings["postprocess"] = time.perf_counter() - start
+    inference_datasets.record(timings)
+    print(f"TFT batch of {len(windows)} windows in {len(batches)} forward passes: dataset build "
+          f"{timings['dataset_build']:.3f}s, forward {timings['forward']:.3f}s, postprocess {timings['postprocess']:.3f}s")
+    return results
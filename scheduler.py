@@ -0,0 +1,153 @@
+"""
+Event-driven data refresh scheduling.
+
+Instead of every web worker polling daily_data every few seconds, one process per deployment (the holder of the
+scheduler lock) runs an APScheduler with one cron job per source release time (Config.REFRESH_SCHEDULE) plus a
+catch-up run at start. Other workers only retry the lock occasionally, so a replacement takes over when the leader
+exits. The refresh itself runs under a second file lock, so overlapping triggers, workers and the standalone runner
+never execute two full refreshes at once.
+
+Standalone runner (with REFRESH_SCHEDULER=external in the web workers): python scheduler.py
+"""
+import os
+import threading
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from data_util.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_DIR = os.path.join("Data", ".locks")
+
+
+class FileLock:
+    """
+    Exclusive inter-process lock on a file (flock / msvcrt). The OS drops it when the holding process exits, so a
+    crashed holder never leaves a stale lock behind. Also excludes other threads of the same process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._thread_lock = threading.Lock()
+
+    def acquire(self, blocking=True):
+        if not self._thread_lock.acquire(blocking):
+            return False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            self._thread_lock.release()
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+        self._thread_lock.release()
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+refresh_lock = FileLock(os.path.join(LOCK_DIR, "refresh.lock"))
+
+
+class RefreshScheduler:
+    """
+    Runs refresh(force) on the configured release schedule in the process that holds the scheduler lock.
+    Scheduled runs pass force=True (a release can land after an earlier refresh the same day); the catch-up run
+    at start passes force=False and only refreshes data that is not from today.
+    """
+
+    def __init__(self, refresh, schedule=None, timezone=None, lock_path=None, retry_seconds=None):
+        self.refresh = refresh
+        self.schedule = schedule or Config.REFRESH_SCHEDULE
+        self.timezone = timezone or Config.REFRESH_TIMEZONE
+        self.lock = FileLock(lock_path or os.path.join(LOCK_DIR, "scheduler.lock"))
+        self.retry_seconds = retry_seconds or Config.REFRESH_LEADER_RETRY_SECONDS
+        self.scheduler = None
+        self._retry_timer = None
+
+    def jobs(self):
+        """{cron expression: [sources]}; sources releasing at the same time share one job."""
+        jobs = {}
+        for source, crontab in self.schedule.items():
+            if crontab:
+                jobs.setdefault(crontab, []).append(source)
+        return jobs
+
+    def _configure(self, scheduler):
+        for crontab, sources in self.jobs().items():
+            scheduler.add_job(self.refresh, CronTrigger.from_crontab(crontab, timezone=self.timezone),
+                              kwargs={"force": True}, id=f"refresh:{'+'.join(sources)}", coalesce=True,
+                              max_instances=1, misfire_grace_time=3600)
+        # Catch up once at start in case the process was down at a release time
+        scheduler.add_job(self.refresh, kwargs={"force": False}, id="refresh:catch-up")
+        return scheduler
+
+    def start(self):
+        """Embedded mode: becomes the deployment's scheduler if no other process is; retries otherwise."""
+        if Config.REFRESH_SCHEDULER != "embedded":
+            return False
+        if not self.lock.acquire(blocking=False):
+            self._retry_timer = threading.Timer(self.retry_seconds, self.start)
+            self._retry_timer.daemon = True
+            self._retry_timer.start()
+            return False
+
+        self.scheduler = self._configure(BackgroundScheduler(timezone=self.timezone))
+        self.scheduler.start()
+        print(f"Refresh scheduler started in process {os.getpid()}: "
+              + ", ".join(f"{'+'.join(sources)} @ '{crontab}'" for crontab, sources in self.jobs().items()))
+        return True
+
+    def run_forever(self):
+        """Standalone mode: blocks until the scheduler lock is free, then runs the schedule in the foreground."""
+        self.lock.acquire()
+        print(f"Refresh scheduler running in process {os.getpid()} ({self.timezone}).")
+        self.scheduler = self._configure(BlockingScheduler(timezone=self.timezone))
+        try:
+            self.scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.lock.release()
+
+
+if __name__ == "__main__":
+    # Only the refresh is needed in this process: no embedded scheduler and no model preload
+    Config.REFRESH_SCHEDULER = "off"
+    Config.PRELOAD_MODEL = False
+    from app import get_data
+
+    RefreshScheduler(get_data).run_forever()
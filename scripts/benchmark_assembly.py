@@ -0,0 +1,92 @@
+"""
+Compares the old daily_data assembly (left merges into a dense 2000-2030 daily calendar, trimmed at the end)
+with data_util.frame_util.assemble_daily (single-pass alignment onto the final, trimmed index, float32 features).
+
+Sources are synthetic frames with the shapes and extents of the real ones (BTC prices, blockchain.info charts,
+indicators, ETF flows, BEA/FRED indices), or the stage checkpoints of a refresh with --checkpoints.
+Peak memory is measured with tracemalloc (numpy allocations included).
+Usage: python -m scripts.benchmark_assembly [--repeat 5] [--checkpoints Data/Cache/Stages]
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from data_processing import remove_fully_nan_rows
+from data_util.frame_util import assemble_daily
+from data_util.storage_util import get_storage
+
+SOURCES = ["df_btc", "bitcoin_df_indices", "bitcoin_df", "bitcoin_etf_df", "bea_indices_df", "fred_df"]
+
+
+def synthetic_sources(seed=0):
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.today().normalize()
+
+    def frame(start, columns, end=today, freq="D", prefix="c"):
+        index = pd.date_range(start, end, freq=freq, name="Date")
+        return pd.DataFrame(rng.normal(size=(len(index), columns)), index=index,
+                            columns=[f"{prefix}{i}" for i in range(columns)])
+
+    df_btc = frame("2014-09-17", 5, prefix="p")
+    df_btc.columns = ["Close", "High", "Low", "Open", "Volume"]
+    return [
+        df_btc,
+        frame("2009-01-03", 3, prefix="BTC_ind"),
+        frame("2009-01-03", 23, prefix="chain"),
+        frame("2024-01-11", 13, freq="B", prefix="etf"),
+        frame("2010-01-01", 8, end=today + pd.Timedelta(days=180), prefix="bea"),
+        frame("1990-01-01", 18, prefix="fred"),
+    ]
+
+
+def merge_chain(frames):
+    """The assembly as get_data did it before frame_util."""
+    main_df = pd.DataFrame(index=pd.date_range(start="2000-01-01", end="2030-12-31", freq="D"))
+    main_df.index.name = "Date"
+    for df in frames:
+        main_df = main_df.merge(df, on="Date", how="left")
+    main_df = remove_fully_nan_rows(main_df)
+    return main_df[main_df.index >= main_df["Close"].first_valid_index()]
+
+
+def measure(fn, frames, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(frames)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn(frames)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, min(timings), peak / 2 ** 20
+
+
+def run(repeat, checkpoints=None):
+    if checkpoints:
+        storage = get_storage(checkpoints)
+        frames = [storage.read(name) for name in SOURCES]
+    else:
+        frames = synthetic_sources()
+
+    old, old_seconds, old_peak = measure(merge_chain, frames, repeat)
+    new, new_seconds, new_peak = measure(assemble_daily, frames, repeat)
+
+    pd.testing.assert_index_equal(old.index, new.index, check_names=False, exact=False)
+    assert list(old.columns) == list(new.columns)
+    max_rel = np.nanmax(np.abs(new.to_numpy(dtype=np.float64) - old.to_numpy(dtype=np.float64))
+                        / np.maximum(np.abs(old.to_numpy(dtype=np.float64)), 1e-12))
+    print(f"{'':<14}{'best time [ms]':>16}{'peak memory [MB]':>18}{'result [MB]':>14}")
+    print(f"{'merge chain':<14}{old_seconds * 1000:>16.1f}{old_peak:>18.1f}{old.memory_usage().sum() / 2 ** 20:>14.1f}")
+    print(f"{'assemble':<14}{new_seconds * 1000:>16.1f}{new_peak:>18.1f}{new.memory_usage().sum() / 2 ** 20:>14.1f}")
+    print(f"{len(new)} rows x {len(new.columns)} columns, max relative difference {max_rel:.2e} (float32)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark daily_data assembly: merge chain vs single pass.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--checkpoints", default=None, help="Read the sources from refresh stage checkpoints")
+    args = parser.parse_args()
+    run(args.repeat, args.checkpoints)
@@ -0,0 +1,75 @@
+"""
+Compares load time and resident memory of the storage backends against the CSV path.
+
+Every measurement runs in a fresh process so RSS is not polluted by earlier reads. Besides RSS the anonymous
+(non-shareable) memory is reported: memory-mapped columns show up in RSS but are page cache shared by all workers.
+Usage: python -m scripts.benchmark_storage [--name daily_data] [--column Close] [--repeat 5]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+from data_util.storage_util import STORAGE_BACKENDS, get_storage, migrate_csv
+
+
+def _memory_mb():
+    """Returns (RSS, anonymous memory) of the current process in MB."""
+    with open("/proc/self/statm") as f:
+        rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    anon = 0.0
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Anonymous:"):
+                anon = int(line.split()[1]) / 1024
+    return rss, anon
+
+
+def _measure(root, backend, name, columns, mmap, repeat, queue):
+    storage = get_storage(root, backend, csv_fallback=False)
+    rss_before, anon_before = _memory_mb()
+    timings = []
+    frames = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = storage.read(name, columns=columns, mmap=mmap)
+        # Touch the data so lazily mapped pages are counted as well
+        df.sum(numeric_only=True)
+        timings.append(time.perf_counter() - start)
+        frames.append(df)
+    rss_after, anon_after = _memory_mb()
+    queue.put((min(timings), (rss_after - rss_before) / repeat, (anon_after - anon_before) / repeat))
+
+
+def run(root, name, column, repeat):
+    ctx = mp.get_context("spawn")
+    print(f"{'backend':<10}{'projection':<12}{'mmap':<6}{'best load [ms]':>16}{'RSS / copy [MB]':>18}"
+          f"{'anon / copy [MB]':>18}")
+    for backend in STORAGE_BACKENDS:
+        try:
+            storage = get_storage(root, backend, csv_fallback=False)
+        except ImportError as e:
+            print(f"{backend:<10}skipped: {e}")
+            continue
+        if not storage.exists(name):
+            migrate_csv(root, backend, names=[name])
+
+        for columns in (None, [column]):
+            for mmap in ((False, True) if backend != "csv" else (False,)):
+                queue = ctx.Queue()
+                proc = ctx.Process(target=_measure, args=(root, backend, name, columns, mmap, repeat, queue))
+                proc.start()
+                best, rss, anon = queue.get()
+                proc.join()
+                projection = "all" if columns is None else column
+                print(f"{backend:<10}{projection:<12}{str(mmap):<6}{best * 1000:>16.1f}{rss:>18.1f}{anon:>18.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark storage backends against CSV.")
+    parser.add_argument("--root", default="Data")
+    parser.add_argument("--name", default="daily_data")
+    parser.add_argument("--column", default="Close")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.root, args.name, args.column, args.repeat)
@@ -0,0 +1,132 @@
+"""
+Exports the TFT checkpoint to a dynamically int8-quantized inference artifact (Models/<name>.int8.pt) and checks
+quantile parity against the full-precision model on several recent prediction windows of daily_data.
+
+The artifact is only written when the largest quantile error relative to the mean absolute forecast stays within
+--tolerance (or with --force). Its report (parity, latency, size, source checkpoint digest) is stored next to it as
+<artifact>.json; predict.load_model serves the artifact only while that digest matches the checkpoint.
+Usage: python -m scripts.export_model [--checkpoint Models/TFT_Model_3.ckpt] [--windows 6] [--tolerance 0.01]
+"""
+import argparse
+import copy
+import json
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import torch
+
+from data_processing import TFTPreprocessor
+from data_util.cache_util import FileFingerprint
+from data_util.storage_util import get_storage
+from predict import (MODEL_PATH, InferenceDatasetCache, _load_checkpoint, predict_quantiles, prepare_prediction_window,
+                     prediction_window_bounds, quantized_artifact_path)
+
+
+def quantize(model):
+    """
+    Dynamic int8 quantization of the Linear layers (weights int8, activations quantized on the fly). The LSTMs are
+    pytorch_forecasting subclasses with their own length handling and stay in fp32.
+    """
+    quantized = torch.ao.quantization.quantize_dynamic(copy.deepcopy(model).cpu(), {torch.nn.Linear},
+                                                       dtype=torch.qint8)
+    quantized.eval()
+    return quantized
+
+
+def prediction_batches(model, root, windows, max_encoder_length, max_prediction_length):
+    """Collated batches of the last `windows` prediction windows (one month apart), newest first."""
+    df = get_storage(root).read("daily_data").sort_index()
+    preprocessor = TFTPreprocessor().fit(df)
+    last_close = df["Close"].last_valid_index()
+    datasets = InferenceDatasetCache(max_entries=windows)
+
+    batches = []
+    for i in range(windows):
+        prediction_start = last_close + pd.Timedelta(days=1) - pd.Timedelta(days=30 * i)
+        window = preprocessor.transform(
+            df, *prediction_window_bounds(max_encoder_length, max_prediction_length, prediction_start))
+        window = prepare_prediction_window(window, max_encoder_length, max_prediction_length, prediction_start)
+        entry, _ = datasets.get(model, window)
+        batches.append(datasets.batches(entry, torch.device("cpu")))
+    return batches
+
+
+def latency_ms(model, batches, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for window in batches:
+            predict_quantiles(model, window)
+        timings.append((time.perf_counter() - start) / len(batches))
+    return float(np.median(timings) * 1000)
+
+
+def parity(reference, candidate, batches):
+    max_abs, max_rel, crossings = 0.0, 0.0, 0
+    for window in batches:
+        expected = predict_quantiles(reference, window).float().numpy()
+        actual = predict_quantiles(candidate, window).float().numpy()
+        error = np.abs(actual - expected).max()
+        max_abs = max(max_abs, float(error))
+        max_rel = max(max_rel, float(error / max(np.abs(expected).mean(), 1e-12)))
+        crossings += int((np.diff(actual, axis=-1) < 0).sum())
+    return {"max_abs_error": max_abs, "max_rel_error": max_rel, "quantile_crossings": crossings,
+            "windows": len(batches)}
+
+
+def run(checkpoint, root, windows, max_encoder_length, max_prediction_length, tolerance, repeat, force):
+    model = _load_checkpoint(checkpoint).cpu()
+    quantized = quantize(model)
+    batches = prediction_batches(model, root, windows, max_encoder_length, max_prediction_length)
+
+    report = parity(model, quantized, batches)
+    report["tolerance"] = tolerance
+    passed = report["max_rel_error"] <= tolerance
+    print(f"Parity over {report['windows']} windows: max abs error {report['max_abs_error']:.4g}, "
+          f"max rel error {report['max_rel_error']:.4%} (tolerance {tolerance:.2%}), "
+          f"{report['quantile_crossings']} quantile crossings -> {'OK' if passed else 'FAILED'}")
+
+    fp32_ms, int8_ms = latency_ms(model, batches, repeat), latency_ms(quantized, batches, repeat)
+    print(f"Latency per forecast: fp32 {fp32_ms:.1f} ms, int8 {int8_ms:.1f} ms")
+
+    if not passed and not force:
+        print("Artifact not written (use --force to export anyway; it will not be served).")
+        return False
+
+    artifact = quantized_artifact_path(checkpoint)
+    tmp_path = f"{artifact}.{os.getpid()}.tmp"
+    torch.save(quantized, tmp_path)
+    os.replace(tmp_path, artifact)
+
+    meta = {
+        "source": checkpoint,
+        "source_digest": FileFingerprint(checkpoint).digest(),
+        "dtype": "qint8",
+        "quantized_modules": ["Linear"],
+        "parity": report,
+        "parity_passed": passed,
+        "latency_ms": {"fp32": fp32_ms, "int8": int8_ms},
+        "size_mb": {"checkpoint": os.path.getsize(checkpoint) / 2 ** 20, "artifact": os.path.getsize(artifact) / 2 ** 20},
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(f"{artifact}.json", "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"Wrote {artifact} ({meta['size_mb']['artifact']:.1f} MB, checkpoint {meta['size_mb']['checkpoint']:.1f} MB).")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the TFT checkpoint to an int8 inference artifact.")
+    parser.add_argument("--checkpoint", default=MODEL_PATH)
+    parser.add_argument("--root", default="Data")
+    parser.add_argument("--windows", type=int, default=6)
+    parser.add_argument("--max-encoder-length", type=int, default=31)
+    parser.add_argument("--max-prediction-length", type=int, default=31)
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Max quantile error relative to the forecast")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--force", action="store_true", help="Write the artifact even if the parity check fails")
+    args = parser.parse_args()
+    run(args.checkpoint, args.root, args.windows, args.max_encoder_length, args.max_prediction_length,
+        args.tolerance, args.repeat, args.force)
@@ -0,0 +1,19 @@
+"""
+One-off migration of the CSV frames in Data/ (daily_data.csv and Subsets/*.csv) to the binary storage backend.
+
+Usage: python -m scripts.migrate_storage [--backend npy|parquet] [--delete-csv]
+"""
+import argparse
+
+from data_util.storage_util import migrate_csv
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert Data/*.csv frames to a binary storage backend.")
+    parser.add_argument("--root", default="Data")
+    parser.add_argument("--backend", default=None, help="Target backend (default: Config.STORAGE_BACKEND)")
+    parser.add_argument("--delete-csv", action="store_true", help="Remove the CSV files after conversion")
+    args = parser.parse_args()
+
+    migrated = migrate_csv(args.root, args.backend, delete_csv=args.delete_csv)
+    print(f"Migrated {len(migrated)} frames.")
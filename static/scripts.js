@@ -46,6 +46,18 @@ function initializeChart() {
                 pointRadius: 0,
                 fill: true,
                 backgroundColor: "rgba(247,147,26,0.2)"
+            }, {
+                // Razpon min/max tedenskih oz. mesečnih agregatov
+                data: [],
+                borderWidth: 0,
+                pointRadius: 0,
+                fill: false
+            }, {
+                data: [],
+                borderWidth: 0,
+                pointRadius: 0,
+                fill: "-1",
+                backgroundColor: "rgba(247,147,26,0.15)"
             }]
         },
         options: {
@@ -85,24 +97,63 @@ function loadMetrics(category) {
         });
 }
 
+const RESOLUTIONS = { day: "dnevno", week: "tedensko", month: "mesečno" };
+let currentSeries = null;
+
 function loadChartData(category, metric) {
+    currentSeries = { category, metric };
     showLoading();
-    fetch(`/get_chart_data?category=${category}&metric=${metric}`)
+    // Strežnik vrne le izbrano obdobje in največ toliko točk, kot je graf širok
+    const params = new URLSearchParams({ category, metric, max_points: chart.width || 1000 });
+    const start = document.getElementById("range-start")?.value;
+    const end = document.getElementById("range-end")?.value;
+    if (start) params.set("start", start);
+    if (end) params.set("end", end);
+
+    fetch(`/get_chart_data?${params}`)
         .then(res => res.json())
         .then(data => {
             hideLoading();
-            if (data.dates && data.values) {
-                chart.data.labels = data.dates;
+            if (data.days && data.values) {
+                const dates = columnarDates(data);
+                chart.data.labels = dates;
                 chart.data.datasets[0].data = data.values;
+                chart.data.datasets[1].data = data.min || [];
+                chart.data.datasets[2].data = data.max || [];
                 chart.update();
-                updateTable(data);
-                document.getElementById("chart-title").innerText = `Graf - ${category.toUpperCase()} - ${metric}`;
+                updateTable({ dates, values: data.values });
+                const resolution = RESOLUTIONS[data.resolution] || data.resolution;
+                document.getElementById("chart-title").innerText =
+                    `Graf - ${category.toUpperCase()} - ${metric}` + (data.resolution !== "day" ? ` (${resolution})` : "");
                 updateDataSource(category);
             }
         })
         .catch(() => showError());
 }
 
+function applyRange(reset = false) {
+    if (reset) {
+        document.getElementById("range-start").value = "";
+        document.getElementById("range-end").value = "";
+    }
+    if (currentSeries) loadChartData(currentSeries.category, currentSeries.metric);
+}
+
+// Stolpčni zapis strežnika: datumi so zamiki v dnevih od "start"
+function columnarDates(block) {
+    const start = Date.parse(block.start);
+    return block.days.map(day => new Date(start + day * 86400000).toISOString().slice(0, 10));
+}
+
+function columnarRecords(block) {
+    const fields = Object.keys(block).filter(key => key !== "start" && key !== "days");
+    return columnarDates(block).map((date, i) => {
+        const record = { Date: date };
+        fields.forEach(field => record[field] = block[field][i]);
+        return record;
+    });
+}
+
 function updateTable(data) {
     const tbody = document.querySelector("#data-table tbody");
     tbody.innerHTML = data.dates.map((date, i) => `<tr><td>${date}</td><td>${data.values[i]}</td></tr>`).join("");
@@ -142,8 +193,7 @@ async function fetchPredictionData() {
     const maxPredictionLength = 31;
 
     try {
-        const response = await fetch(`/predict_and_plot?max_encoder_length=${maxEncoderLength}&max_prediction_length=${maxPredictionLength}`);
-        const data = await response.json();
+        const data = await runForecastJob(maxEncoderLength, maxPredictionLength);
 
         if (!data.historical || !data.predicted) {
             console.error("Napaka: Neveljavni podatki prejeti.");
@@ -158,7 +208,7 @@ async function fetchPredictionData() {
         document.getElementById("loading").style.display = "none";
         document.getElementById("main-content").style.display = "block";
 
-        renderChart(data.historical, data.predicted);
+        renderChart(columnarRecords(data.historical), columnarRecords(data.predicted));
 
     } catch (error) {
         console.error("Napaka pri pridobivanju napovedi:", error);
@@ -167,6 +217,45 @@ async function fetchPredictionData() {
     }
 }
 
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+// Napoved se izvaja v ozadju: oddaj posel, spremljaj njegovo stanje in nato prevzemi rezultat
+async function runForecastJob(maxEncoderLength, maxPredictionLength) {
+    let response;
+    while (true) {
+        response = await fetch("/forecast_jobs", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ max_encoder_length: maxEncoderLength, max_prediction_length: maxPredictionLength })
+        });
+        if (response.status !== 503) break;
+        // Vrsta je polna: poskusi znova čez Retry-After sekund
+        setLoadingText("Strežnik je zaseden, napoved je v čakanju...");
+        await sleep(1000 * (parseInt(response.headers.get("Retry-After"), 10) || 5));
+    }
+    let job = await response.json();
+    if (!response.ok) throw new Error(job.error || `HTTP ${response.status}`);
+
+    while (job.status === "queued" || job.status === "running") {
+        setLoadingText(`Napoved: ${job.stage} (${Math.round(job.progress * 100)} %)`);
+        await sleep(500);
+        const statusResponse = await fetch(job.status_url || `/forecast_jobs/${job.job_id}`);
+        job = { ...job, ...(await statusResponse.json()) };
+        if (!statusResponse.ok) throw new Error(job.error || `HTTP ${statusResponse.status}`);
+    }
+    if (job.status === "failed") throw new Error(job.error);
+
+    const resultResponse = await fetch(`/forecast_jobs/${job.job_id}/result`);
+    const data = await resultResponse.json();
+    if (!resultResponse.ok) throw new Error(data.error || `HTTP ${resultResponse.status}`);
+    return data;
+}
+
+function setLoadingText(text) {
+    const label = document.querySelector("#loading p");
+    if (label) label.textContent = text;
+}
+
 function renderChart(historicalData, predictedData) {
     const ctx = document.getElementById("predictionChart").getContext("2d");
 
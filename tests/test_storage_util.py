@@ -0,0 +1,39 @@
+import pandas as pd
+
+from data_util.cache_util import FileFingerprint
+from data_util.storage_util import CsvStorage, get_storage
+
+
+def _frame(values):
+    return pd.DataFrame({"Close": values},
+                        index=pd.DatetimeIndex(pd.date_range("2024-01-01", periods=len(values)), name="Date"))
+
+
+def test_csv_fallback_reads_csv_until_backend_is_written(tmp_path):
+    CsvStorage(str(tmp_path)).write("daily_data", _frame([1.0, 2.0]))
+    storage = get_storage(str(tmp_path), "npy")
+
+    assert storage.exists("daily_data")
+    assert storage.path("daily_data").endswith("daily_data.csv")
+    assert storage.read("daily_data")["Close"].tolist() == [1.0, 2.0]
+
+    storage.write("daily_data", _frame([1.0, 2.0, 3.0]))
+    assert storage.path("daily_data").endswith("meta.json")
+    assert storage.read("daily_data")["Close"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_fingerprint_follows_csv_to_backend_handover(tmp_path):
+    CsvStorage(str(tmp_path)).write("daily_data", _frame([1.0, 2.0]))
+    storage = get_storage(str(tmp_path), "npy")
+    fingerprint = FileFingerprint(lambda: storage.path("daily_data"))
+    csv_digest = fingerprint.digest()
+    assert csv_digest is not None and not fingerprint.changed()
+
+    storage.write("daily_data", _frame([1.0, 2.0, 3.0]))
+    assert fingerprint.changed()
+    npy_digest = fingerprint.digest()
+    assert npy_digest not in (None, csv_digest)
+
+    storage.write("daily_data", _frame([1.0, 2.0, 3.0, 4.0]))
+    assert fingerprint.changed()
+    assert fingerprint.digest() != npy_digest